@@ -0,0 +1,93 @@
+"""Размер и время ответа JSON API против HTML-страниц.
+
+Создаёт временную базу с синтетическими постами, затем запрашивает одни
+и те же страницы лент и поста через HTML-представления и через
+/api/v1/ и печатает байты на страницу и медиану времени ответа.
+Кэш целых страниц выключен, чтобы сравнивать именно рендеринг.
+
+    python benchmarks/bench_api.py --posts 2000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from posts import threads  # noqa: E402
+from posts.models import Comment, Group, Post  # noqa: E402
+
+
+def seed(posts, authors=20):
+    users = [get_user_model().objects.create_user(username=f'author{i}')
+             for i in range(authors)]
+    group = Group.objects.create(title='Группа', slug='group')
+    Post.objects.bulk_create(
+        Post(text=f'Пост номер {i}. ' * 20, author=users[i % authors],
+             group=group if i % 3 == 0 else None)
+        for i in range(posts)
+    )
+    post = Post.objects.order_by('-pub_date', '-id').first()
+    Comment.objects.bulk_create(
+        Comment(post=post, author=users[i % authors], text=f'Ответ {i}')
+        for i in range(30)
+    )
+    threads.fill_paths(posts=[post.pk])
+    return users[0].username, post
+
+
+def measure(client, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - started)
+    assert response.status_code == 200, (url, response.status_code)
+    return len(response.content), statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        username, post = seed(args.posts)
+        pages = [
+            ('index', '/', '/api/v1/posts/'),
+            ('group', '/group/group/', '/api/v1/groups/group/posts/'),
+            ('profile', f'/{username}/',
+             f'/api/v1/users/{username}/posts/'),
+            ('post', f'/{post.author.username}/{post.id}/',
+             f'/api/v1/posts/{post.id}/'),
+            ('comments', f'/{post.author.username}/{post.id}/',
+             f'/api/v1/posts/{post.id}/comments/?limit=30'),
+        ]
+        client = Client()
+        print(f'{"страница":10} {"HTML, Б":>9} {"API, Б":>9} '
+              f'{"HTML, мс":>9} {"API, мс":>9}')
+        with override_settings(POSTS_PAGE_CACHE=False):
+            for name, html_url, api_url in pages:
+                html_bytes, html_ms = measure(client, html_url, args.repeat)
+                api_bytes, api_ms = measure(client, api_url, args.repeat)
+                print(f'{name:10} {html_bytes:9} {api_bytes:9} '
+                      f'{html_ms:9.2f} {api_ms:9.2f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
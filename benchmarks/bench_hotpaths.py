@@ -0,0 +1,296 @@
+"""Бенчмарки горячих путей с сохранением и сравнением результатов.
+
+Во временной базе создаётся синтетический набор (posts.synthetic), после
+чего замеряются: страница Paginator по большой ленте постов, рендеринг
+index.html и карточки поста с холодным и тёплым кэшем фрагментов,
+построение миниатюр картинки, запросы ленты подписок, рендеринг
+includes/comments.html и хеширование пароля при входе и регистрации.
+
+Каждый бенчмарк калибруется, как timeit.autorange, чтобы раунд длился не
+меньше --min-time, и прогоняется --rounds раз; в JSON сохраняется время
+одного вызова по каждому раунду. С --baseline результат сравнивается
+с базовым файлом (см. benchmarks/compare.py), код выхода 1 при регрессии.
+
+    python benchmarks/bench_hotpaths.py --save baseline.json
+    python benchmarks/bench_hotpaths.py --baseline baseline.json \\
+        --save results.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import authenticate  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.paginator import Paginator  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from compare import compare, report  # noqa: E402
+from posts import thumbnails  # noqa: E402
+from posts.feed import feed_queryset, follow_feed  # noqa: E402
+from posts.forms import CommentForm  # noqa: E402
+from posts.models import Comment, Post  # noqa: E402
+from posts.paginator import POSTS_PER_PAGE  # noqa: E402
+from posts.synthetic import PASSWORD, generate  # noqa: E402
+from users.models import Profile  # noqa: E402
+
+COMMENTS = 50
+MAX_NUMBER = 10 ** 6
+
+BENCHMARKS = {}
+
+
+def benchmark(name, before=None):
+    """Регистрирует бенчмарк; before(data) вызывается вне замера."""
+    def decorator(func):
+        BENCHMARKS[name] = (func, before)
+        return func
+    return decorator
+
+
+def clear_cache(data):
+    cache.clear()
+
+
+def evaluated_page(queryset, number):
+    paginator = Paginator(queryset, POSTS_PER_PAGE)
+    page = paginator.get_page(number)
+    list(page)
+    return paginator, page
+
+
+@benchmark('paginator.first_page')
+def paginator_first_page(data):
+    evaluated_page(feed_queryset(), 1)
+
+
+@benchmark('paginator.middle_page')
+def paginator_middle_page(data):
+    evaluated_page(feed_queryset(), data.middle_page)
+
+
+@benchmark('render.index', before=clear_cache)
+def render_index(data):
+    render_to_string('index.html', data.index, data.request)
+
+
+@benchmark('render.index_warm')
+def render_index_warm(data):
+    render_to_string('index.html', data.index, data.request)
+
+
+@benchmark('render.post_card', before=clear_cache)
+def render_post_card(data):
+    render_to_string('includes/post_card.html', {'post': data.image_post},
+                     data.request)
+
+
+@benchmark('thumbnail.build')
+def thumbnail_build(data):
+    thumbnails.build(data.image_post.image)
+
+
+@benchmark('feed.follow')
+def feed_follow(data):
+    evaluated_page(follow_feed(data.reader), 1)
+
+
+@benchmark('render.comments')
+def render_comments(data):
+    render_to_string('includes/comments.html', data.comments,
+                     data.reader_request)
+
+
+@benchmark('auth.make_password')
+def auth_make_password(data):
+    make_password(PASSWORD)
+
+
+@benchmark('auth.authenticate')
+def auth_authenticate(data):
+    assert authenticate(username=data.reader.username, password=PASSWORD)
+
+
+def seed(posts):
+    generate(users=200, groups=10, posts=posts, comments=posts, follows=30,
+             images=2, image_share=0.05)
+    reader = (Profile.objects.select_related('user')
+              .order_by('-following_count').first().user)
+    image_post = Post.objects.exclude(image='').exclude(image=None).first()
+    thumbnails.generate(image_post.id)
+    image_post = feed_queryset().get(id=image_post.id)
+    post = Post.objects.select_related('author').first()
+    Comment.objects.bulk_create(
+        Comment(post=post, author=reader, text=f'Комментарий {i}. ' * 5)
+        for i in range(COMMENTS)
+    )
+    factory = RequestFactory()
+    request = factory.get('/')
+    request.user = post.author
+    reader_request = factory.get(f'/{post.author.username}/{post.id}/')
+    reader_request.user = reader
+    paginator, page = evaluated_page(feed_queryset(), 1)
+    return SimpleNamespace(
+        reader=reader,
+        image_post=image_post,
+        request=request,
+        reader_request=reader_request,
+        middle_page=paginator.num_pages // 2 or 1,
+        index={'page': page, 'paginator': paginator},
+        comments={
+            'comments': list(post.comments.select_related('author')),
+            'form': CommentForm(),
+            'author': post.author,
+            'post_id': post.id,
+            'post': post,
+        },
+    )
+
+
+def timed(func, before, data, number):
+    total = 0.0
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(number):
+            if before is not None:
+                before(data)
+            started = time.perf_counter()
+            func(data)
+            total += time.perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return total
+
+
+def calibrate(func, before, data, min_time):
+    """Число вызовов на раунд, как в timeit.autorange."""
+    number = 1
+    while number < MAX_NUMBER:
+        elapsed = timed(func, before, data, number)
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 10 >= min_time else 10
+    return number
+
+
+def measure(func, before, data, rounds, min_time):
+    timed(func, before, data, 1)
+    number = calibrate(func, before, data, min_time)
+    samples = [timed(func, before, data, number) / number
+               for _ in range(rounds)]
+    quartiles = statistics.quantiles(samples, n=4)
+    return {
+        'number': number,
+        'samples': samples,
+        'median': statistics.median(samples),
+        'iqr': quartiles[2] - quartiles[0],
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    names = [name for name in BENCHMARKS
+             if not args.only or any(part in name for part in args.only)]
+    data = seed(args.posts)
+    results = {}
+    print(f'{"бенчмарк":28} {"медиана, мс":>12} {"IQR, мс":>9} '
+          f'{"вызовов":>8}')
+    for name in names:
+        func, before = BENCHMARKS[name]
+        results[name] = measure(func, before, data, args.rounds,
+                                args.min_time)
+        print(f'{name:28} {results[name]["median"] * 1000:12.3f} '
+              f'{results[name]["iqr"] * 1000:9.3f} '
+              f'{results[name]["number"]:8}')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=15)
+    parser.add_argument('--min-time', type=float, default=0.1)
+    parser.add_argument('--only', nargs='*',
+                        help='части имён бенчмарков для запуска')
+    parser.add_argument('--save', help='куда записать результат (JSON)')
+    parser.add_argument('--baseline', help='базовый результат (JSON)')
+    args = parser.parse_args()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    # Свой кэш и каталог медиа, чтобы не задеть данные настоящего сайта
+    media = tempfile.TemporaryDirectory()
+    try:
+        with override_settings(
+            MEDIA_ROOT=media.name,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            }},
+        ):
+            results = run(args)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        media.cleanup()
+    current = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'commit': commit(),
+        'posts': args.posts,
+        'environment': environment(),
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(current, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        rows = compare(baseline, current)
+        print()
+        report(rows, baseline, current)
+        sys.exit(any(row['verdict'] == 'regression' for row in rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Пропускная способность SQLite при параллельных читателях и писателях.
+
+Создаёт файл базы с синтетическим набором (posts.synthetic), затем для
+каждого профиля берёт его свежую копию и запускает --readers процессов,
+которые смотрят ленты, профили и посты, и --writers процессов, которые
+комментируют и подписываются. Каждый процесс — отдельный интерпретатор
+с настройками профиля в окружении, как воркер gunicorn; запросы идут
+через django.test.Client, так что соединения открываются и закрываются
+по обычным правилам CONN_MAX_AGE.
+
+Профили:
+
+* default — журнал отката, PRAGMA по умолчанию, соединение на запрос;
+* tuned — PRAGMA из POSTS_SQLITE_PRAGMAS (WAL, busy_timeout, mmap...)
+  и постоянные соединения.
+
+Печатает запросы в секунду, ошибки («database is locked») и перцентили
+времени ответа для чтений и записей.
+
+    python benchmarks/bench_sqlite.py --readers 8 --writers 4 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+PROFILES = {
+    'default': {'YATUBE_SQLITE_TUNING': '0', 'YATUBE_CONN_MAX_AGE': '0'},
+    'tuned': {'YATUBE_SQLITE_TUNING': '1', 'YATUBE_CONN_MAX_AGE': '600'},
+}
+
+if __name__ == '__main__':
+    # Шаблон базы создаётся без WAL: режим журнала хранится в файле
+    WORKDIR = tempfile.mkdtemp(prefix='yatube-sqlite-')
+    os.environ['YATUBE_DB_NAME'] = os.path.join(WORKDIR, 'template.sqlite3')
+    os.environ.update(PROFILES['default'])
+    # Шаблоны компилируются один раз на процесс, как в бою
+    os.environ.setdefault('YATUBE_TEMPLATE_CACHE', '1')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from posts.models import Post  # noqa: E402
+from posts.synthetic import generate  # noqa: E402
+
+TARGETS = 200
+WRITE_FOLLOW_SHARE = 0.3
+
+
+def seed(posts, workers):
+    call_command('migrate', verbosity=0, interactive=False)
+    generate(users=max(50, workers), posts=posts, comments=posts * 2,
+             follows=10, images=0)
+    connections.close_all()
+
+
+def targets():
+    return list(Post.objects.order_by('-pub_date').values_list(
+        'author__username', 'id')[:TARGETS])
+
+
+def read(client, rnd, posts):
+    author, post_id = rnd.choice(posts)
+    url = rnd.choice([reverse('index'), reverse('profile', args=(author,)),
+                      reverse('post', args=(author, post_id)),
+                      reverse('follow_index')])
+    return client.get(url)
+
+
+def write(client, rnd, posts):
+    author, post_id = rnd.choice(posts)
+    if rnd.random() < WRITE_FOLLOW_SHARE:
+        name = rnd.choice(['profile_follow', 'profile_unfollow'])
+        return client.get(reverse(name, args=(author,)))
+    return client.post(reverse('add_comment', args=(author, post_id)),
+                       {'text': f'Комментарий {rnd.random()}'})
+
+
+def worker(role, number, seconds, start, results):
+    setup_test_environment()
+    rnd = random.Random(number)
+    user = get_user_model().objects.order_by('id')[number]
+    client = Client()
+    client.force_login(user)
+    posts = targets()
+    action = read if role == 'read' else write
+    timings, errors, error = [], 0, None
+    connections.close_all()
+    start.wait()
+    with override_settings(DEBUG=False, POSTS_PAGE_CACHE=False,
+                           POSTS_INSTRUMENTATION=False):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = action(client, rnd, posts)
+                if response.status_code >= 400:
+                    raise RuntimeError(f'ответ {response.status_code}')
+            except Exception as exc:
+                errors += 1
+                error = error or f'{type(exc).__name__}: {exc}'
+            else:
+                timings.append(time.perf_counter() - started)
+    connections.close_all()
+    results.put((role, timings, errors, error))
+
+
+def percentile(values, share):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[round(share * 100) - 1]
+
+
+def run_profile(name, template, args):
+    path = os.path.join(os.path.dirname(template), f'{name}.sqlite3')
+    shutil.copyfile(template, path)
+    os.environ['YATUBE_DB_NAME'] = path
+    os.environ.update(PROFILES[name])
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    results = context.Queue()
+    roles = ['read'] * args.readers + ['write'] * args.writers
+    processes = [
+        context.Process(target=worker,
+                        args=(role, number, args.seconds, start, results))
+        for number, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    # Даём воркерам загрузить Django до общего старта
+    time.sleep(args.warmup)
+    start.set()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    summary = {}
+    for role in ('read', 'write'):
+        timings = [t for r, ts, _, _ in rows if r == role for t in ts]
+        summary[role] = {
+            'rps': len(timings) / args.seconds,
+            'errors': sum(e for r, _, e, _ in rows if r == role),
+            'p50': percentile(timings, 0.5) * 1000,
+            'p95': percentile(timings, 0.95) * 1000,
+            'error': next((m for r, _, _, m in rows if r == role and m),
+                          None),
+        }
+    return summary
+
+
+def report(name, summary):
+    for role, title in (('read', 'чтение'), ('write', 'запись')):
+        row = summary[role]
+        print(f'{name:8} {title:7} {row["rps"]:9.1f} {row["errors"]:7} '
+              f'{row["p50"]:8.1f} {row["p95"]:8.1f}')
+        if row['error']:
+            print(f'{"":17}{row["error"][:60]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=3,
+                        help='секунд на запуск процессов до старта')
+    parser.add_argument('--profiles', nargs='*', default=list(PROFILES),
+                        choices=list(PROFILES))
+    args = parser.parse_args()
+    template = connection.settings_dict['NAME']
+    try:
+        seed(args.posts, args.readers + args.writers)
+        results = {}
+        print(f'{"профиль":8} {"":7} {"запр./с":>9} {"ошибки":>7} '
+              f'{"p50, мс":>8} {"p95, мс":>8}')
+        for name in args.profiles:
+            results[name] = run_profile(name, template, args)
+            report(name, results[name])
+        if {'default', 'tuned'} <= set(results):
+            for role, title in (('read', 'чтения'), ('write', 'записи')):
+                before = results['default'][role]['rps']
+                after = results['tuned'][role]['rps']
+                if before:
+                    print(f'{title}: tuned / default = '
+                          f'{after / before:.2f}')
+    finally:
+        connections.close_all()
+        shutil.rmtree(os.path.dirname(template), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
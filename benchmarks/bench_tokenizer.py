@@ -0,0 +1,83 @@
+"""Скорость токенизатора и размер поискового индекса.
+
+Сравнивает простую нормализацию (только casefold) с конвейером
+posts.tokenizer на синтетическом корпусе постов: токены в секунду,
+число различных термов и размер таблицы FTS5 в памяти.
+
+    python benchmarks/bench_tokenizer.py --posts 5000
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from posts.tokenizer import STOP_WORDS, tokenize  # noqa: E402
+
+STEMS = (
+    'кот', 'собак', 'прогулк', 'город', 'дорог', 'фотограф', 'книг', 'утр',
+    'вечер', 'погод', 'работ', 'друз', 'музык', 'поездк', 'море', 'лес',
+)
+ENDINGS = ('', 'а', 'и', 'ы', 'у', 'ой', 'ами', 'ах', 'ов', 'ом', 'е')
+VERBS = ('гуля', 'чита', 'слуша', 'дела', 'снима', 'дума')
+VERB_ENDINGS = ('ть', 'ю', 'ет', 'ем', 'ли', 'ла', 'вший', 'ющий')
+ENGLISH = ('walks', 'walking', 'cats', 'photos', 'reading', 'played')
+
+
+def corpus(posts, words, seed=0):
+    rnd = random.Random(seed)
+    stop_words = sorted(STOP_WORDS)
+    for _ in range(posts):
+        text = []
+        for _ in range(words):
+            roll = rnd.random()
+            if roll < 0.5:
+                word = rnd.choice(STEMS) + rnd.choice(ENDINGS)
+            elif roll < 0.7:
+                word = rnd.choice(VERBS) + rnd.choice(VERB_ENDINGS)
+            elif roll < 0.8:
+                word = rnd.choice(ENGLISH)
+            else:
+                word = rnd.choice(stop_words)
+            text.append(word.capitalize() if rnd.random() < 0.1 else word)
+        yield ' '.join(text)
+
+
+def plain(text):
+    return [word.casefold() for word in re.findall(r'\w+', text)]
+
+
+def measure(name, texts, tokenizer):
+    started = time.perf_counter()
+    documents = [tokenizer(text) for text in texts]
+    elapsed = time.perf_counter() - started
+    words = sum(len(re.findall(r'\w+', text)) for text in texts)
+    db = sqlite3.connect(':memory:')
+    db.execute('CREATE VIRTUAL TABLE fts USING fts5(body)')
+    db.executemany('INSERT INTO fts (body) VALUES (?)',
+                   ((' '.join(terms),) for terms in documents))
+    db.commit()
+    pages = db.execute('PRAGMA page_count').fetchone()[0]
+    page_size = db.execute('PRAGMA page_size').fetchone()[0]
+    print(f'{name:10} {words / elapsed:12,.0f} токенов/с '
+          f'{len({t for terms in documents for t in terms}):8} термов '
+          f'{sum(map(len, documents)):10} вхождений '
+          f'{pages * page_size / 1024:10,.0f} КБ индекса')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=40)
+    args = parser.parse_args()
+    texts = list(corpus(args.posts, args.words))
+    measure('casefold', texts, plain)
+    measure('tokenizer', texts, tokenize)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Сравнение результатов бенчмарков с базовым прогоном.
+
+Каждый бенчмарк в JSON — это выборка времён одного вызова по раундам.
+Выборки базы и нового прогона сравниваются U-критерием Манна — Уитни
+(нормальное приближение с поправкой на связи): он не требует
+нормальности и устойчив к выбросам от фоновой нагрузки. Поправка Холма
+держит вероятность ложной тревоги на всём наборе не выше alpha.
+Регрессией считается статистически значимое замедление медианы больше
+чем на threshold: мелкие, но «значимые» сдвиги на шумной машине
+в ревью не нужны. При пяти раундах и меньше p-value не опускается ниже
+0.01, поэтому для сравнения нужно хотя бы 10 раундов в каждом прогоне.
+
+    python benchmarks/compare.py baseline.json results.json
+
+Код выхода 1, если есть регрессии.
+"""
+import argparse
+import json
+import math
+import statistics
+import sys
+
+ALPHA = 0.01
+THRESHOLD = 0.05
+
+
+def ranks(values):
+    """Ранги с усреднением для равных значений."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    result = [0.0] * len(values)
+    start = 0
+    while start < len(order):
+        end = start
+        while (end + 1 < len(order)
+               and values[order[end + 1]] == values[order[start]]):
+            end += 1
+        for position in range(start, end + 1):
+            result[order[position]] = (start + end) / 2 + 1
+        start = end + 1
+    return result
+
+
+def mann_whitney(first, second):
+    """Двусторонний p-value U-критерия Манна — Уитни."""
+    n1, n2 = len(first), len(second)
+    if not n1 or not n2:
+        return 1.0
+    combined = list(first) + list(second)
+    n = n1 + n2
+    u = sum(ranks(combined)[:n1]) - n1 * (n1 + 1) / 2
+    ties = {}
+    for value in combined:
+        ties[value] = ties.get(value, 0) + 1
+    correction = sum(t ** 3 - t for t in ties.values()) / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - correction))
+    if sigma == 0:
+        return 1.0
+    delta = abs(u - n1 * n2 / 2)
+    z = max(delta - 0.5, 0) / sigma
+    return math.erfc(z / math.sqrt(2))
+
+
+def holm(p_values):
+    """p-values с поправкой Холма на множественные сравнения."""
+    order = sorted(p_values, key=p_values.get)
+    adjusted = {}
+    running = 0.0
+    for index, name in enumerate(order):
+        running = max(running, min(1.0, (len(order) - index)
+                                   * p_values[name]))
+        adjusted[name] = running
+    return adjusted
+
+
+def compare(baseline, current, alpha=ALPHA, threshold=THRESHOLD):
+    """Строки сравнения по бенчмаркам, общим для обоих прогонов."""
+    old, new = baseline['results'], current['results']
+    common = [name for name in new if name in old]
+    p_values = holm({
+        name: mann_whitney(old[name]['samples'], new[name]['samples'])
+        for name in common
+    })
+    rows = []
+    for name in common:
+        before = statistics.median(old[name]['samples'])
+        after = statistics.median(new[name]['samples'])
+        ratio = after / before if before else math.inf
+        verdict = 'same'
+        if p_values[name] < alpha:
+            if ratio > 1 + threshold:
+                verdict = 'regression'
+            elif ratio < 1 - threshold:
+                verdict = 'improvement'
+        rows.append({
+            'name': name,
+            'before': before,
+            'after': after,
+            'ratio': ratio,
+            'p': p_values[name],
+            'verdict': verdict,
+        })
+    return rows
+
+
+def report(rows, baseline, current, out=sys.stdout):
+    print(f'{"бенчмарк":28} {"база, мс":>10} {"сейчас, мс":>10} '
+          f'{"x":>6} {"p":>8}  итог', file=out)
+    for row in rows:
+        print(f'{row["name"]:28} {row["before"] * 1000:10.3f} '
+              f'{row["after"] * 1000:10.3f} {row["ratio"]:6.2f} '
+              f'{row["p"]:8.4f}  {row["verdict"]}', file=out)
+    for name in current['results'].keys() - baseline['results'].keys():
+        print(f'{name:28} новый, сравнивать не с чем', file=out)
+    for name in baseline['results'].keys() - current['results'].keys():
+        print(f'{name:28} нет в новом прогоне', file=out)
+    if baseline.get('environment') != current.get('environment'):
+        print('Внимание: окружение прогонов различается', file=out)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+    baseline, current = load(args.baseline), load(args.current)
+    rows = compare(baseline, current, args.alpha, args.threshold)
+    report(rows, baseline, current)
+    sys.exit(any(row['verdict'] == 'regression' for row in rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .search import SearchResults
+
+ADMIN_SEARCH_LIMIT = 500
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +12,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = ('-пусто-')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице ищем по поисковому индексу
+        if not search_term:
+            return queryset, False
+        ids = SearchResults(search_term).ids(limit=ADMIN_SEARCH_LIMIT)
+        return queryset.filter(pk__in=ids), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -0,0 +1,215 @@
+"""JSON API только для чтения: ленты, пост, комментарии и профиль.
+
+Все списки отдаются курсорными страницами CursorPaginator
+({"results": [...], "next": курсор, "previous": курсор}), размер
+страницы задаёт ?limit= (не больше MAX_LIMIT). Параметр ?fields=id,text
+выбирает поля ответа: из базы читаются только нужные для них колонки
+(only()), а сериализатор для набора полей собирается один раз и дальше
+берётся из lru_cache. Автор и группа приходят в том же запросе через
+select_related, так что страница стоит один запрос без COUNT.
+"""
+from functools import lru_cache, wraps
+
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from .counters import get_profile
+from .feed import FeedCursorPaginator, feed_queryset, follow_feed
+from .models import Comment, Group, Post
+from .paginator import POSTS_PER_PAGE, CursorPaginator
+
+MAX_LIMIT = 100
+
+
+class ApiError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def image_url(post):
+    if not post.image:
+        return None
+    return post.thumbnail_urls.get('card') or post.image.url
+
+
+def post_url(post):
+    return reverse('post', args=(post.author.username, post.id))
+
+
+# Поле ответа: (колонки для only(), функция получения значения)
+POST_FIELDS = {
+    'id': (('id',), lambda post: post.id),
+    'text': (('text',), lambda post: post.text),
+    'pub_date': (('pub_date',), lambda post: post.pub_date.isoformat()),
+    'author': (('author__username',), lambda post: post.author.username),
+    'group': (('group__slug',),
+              lambda post: post.group.slug if post.group_id else None),
+    'comment_count': (('comment_count',), lambda post: post.comment_count),
+    'image': (('image', 'thumbnails'), image_url),
+    'url': (('author__username',), post_url),
+}
+
+COMMENT_FIELDS = {
+    'id': (('id',), lambda comment: comment.id),
+    'post': (('post',), lambda comment: comment.post_id),
+    'author': (('author__username',),
+               lambda comment: comment.author.username),
+    'text': (('text',), lambda comment: comment.text),
+    'created': (('created',), lambda comment: comment.created.isoformat()),
+    'parent': (('parent',), lambda comment: comment.parent_id),
+}
+
+FIELDS = {
+    'post': POST_FIELDS,
+    'comment': COMMENT_FIELDS,
+}
+
+# Без этих колонок не работают курсор и select_related
+REQUIRED_COLUMNS = {
+    'post': ('id', 'pub_date', 'author__username', 'group__slug'),
+    'comment': ('id', 'created', 'author__username'),
+}
+
+
+class CommentPaginator(CursorPaginator):
+    date_field = 'created'
+
+
+def requested_fields(request, kind):
+    available = FIELDS[kind]
+    if not request.GET.get('fields'):
+        return tuple(available)
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in request.GET['fields'].split(',')
+        if name.strip()
+    ))
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ApiError('Неизвестные поля: %s' % ', '.join(unknown))
+    return fields
+
+
+def columns(kind, fields):
+    names = list(REQUIRED_COLUMNS[kind])
+    for name in fields:
+        names.extend(FIELDS[kind][name][0])
+    return list(dict.fromkeys(names))
+
+
+@lru_cache(maxsize=128)
+def serializer(kind, fields):
+    """Функция, превращающая объект в словарь с полями fields."""
+    getters = [(name, FIELDS[kind][name][1]) for name in fields]
+
+    def serialize(obj):
+        return {name: get(obj) for name, get in getters}
+
+    return serialize
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_PER_PAGE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def api_view(view):
+    """Только GET, ошибки отдаются JSON-объектом {"detail": ...}."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response({'detail': 'Метод не поддерживается'},
+                                 status=405)
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response({'detail': 'Не найдено'}, status=404)
+        except ApiError as error:
+            return json_response({'detail': error.detail},
+                                 status=error.status)
+
+    return wrapper
+
+
+def page_response(request, queryset, kind, paginator_class=CursorPaginator):
+    fields = requested_fields(request, kind)
+    paginator = paginator_class(queryset.only(*columns(kind, fields)),
+                                page_size(request))
+    page = paginator.get_page(request.GET.get('cursor'))
+    serialize = serializer(kind, fields)
+    return json_response({
+        'results': [serialize(obj) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@api_view
+def posts(request):
+    return page_response(request, feed_queryset(), 'post')
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(request, feed_queryset(group.posts.all()), 'post')
+
+
+@api_view
+def user_posts(request, username):
+    author = get_object_or_404(get_user_model(), username=username)
+    return page_response(request, feed_queryset(author.posts.all()), 'post')
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', status=401)
+    return page_response(request, follow_feed(request.user), 'post',
+                         paginator_class=FeedCursorPaginator)
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = requested_fields(request, 'post')
+    post = get_object_or_404(
+        feed_queryset().only(*columns('post', fields)), id=post_id
+    )
+    return json_response(serializer('post', fields)(post))
+
+
+@api_view
+def post_comments(request, post_id):
+    if not Post.objects.filter(id=post_id).exists():
+        raise Http404
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    return page_response(request, comments, 'comment',
+                         paginator_class=CommentPaginator)
+
+
+@api_view
+def user_detail(request, username):
+    author = get_object_or_404(
+        get_user_model().objects.select_related('profile'), username=username
+    )
+    profile = get_profile(author)
+    return json_response({
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'post_count': profile.post_count,
+        'follower_count': profile.follower_count,
+        'following_count': profile.following_count,
+    })
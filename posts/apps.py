@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import (  # noqa: F401
+            instrumentation, signals, sqlite, templating,
+        )
+        instrumentation.install()
+        if getattr(settings, 'POSTS_TEMPLATE_WARMUP', False):
+            templating.warm_up()
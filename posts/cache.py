@@ -0,0 +1,193 @@
+"""Кэш приложения posts поверх настраиваемого бэкенда Django.
+
+Ключи собираются из пространства имён и его поколения:
+posts:<namespace>:<generation>:<parts>. invalidate(namespace) увеличивает
+поколение, и все ключи пространства разом перестают находиться, — это
+работает одинаково для locmem, файлового кэша и memcached.
+
+get_or_compute защищает от «стада»: значение хранится вместе со сроком
+свежести, после которого один воркер под блокировкой пересчитывает его,
+а остальные в это время отдают устаревшую копию.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 5
+POLL_INTERVAL = 0.05
+MAX_KEY_LENGTH = 200
+
+local = threading.local()
+
+
+def get_cache():
+    return caches[getattr(settings, 'POSTS_CACHE_ALIAS', 'default')]
+
+
+def generation(namespace):
+    key = f'posts:ns:{namespace}'
+    cache = get_cache()
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, 1, None)
+        value = cache.get(key, 1)
+    return value
+
+
+def invalidate(namespace):
+    """Сбрасывает все ключи пространства имён."""
+    key = f'posts:ns:{namespace}'
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def make_key(namespace, *parts):
+    key = ':'.join(str(part) for part in parts)
+    if len(key) > MAX_KEY_LENGTH or ' ' in key:
+        key = hashlib.md5(key.encode()).hexdigest()
+    return f'posts:{namespace}:{generation(namespace)}:{key}'
+
+
+def lock_path(cache, key):
+    """Файл блокировки для FileBasedCache, где add() не атомарен."""
+    if not isinstance(cache, FileBasedCache):
+        return None
+    alias = getattr(settings, 'POSTS_CACHE_ALIAS', 'default')
+    digest = hashlib.md5(f'{key}:lock'.encode()).hexdigest()
+    return os.path.join(settings.CACHES[alias]['LOCATION'],
+                        f'{digest}.lock')
+
+
+def held():
+    """Токены блокировок, взятых текущим потоком."""
+    if not hasattr(local, 'tokens'):
+        local.tokens = {}
+    return local.tokens
+
+
+def create_lock(path):
+    token = uuid.uuid4().hex
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return None
+    with os.fdopen(fd, 'w') as file:
+        file.write(token)
+    return token
+
+
+def move_aside(path):
+    """Атомарно забирает файл блокировки под уникальное имя."""
+    aside = f'{path}.{uuid.uuid4().hex}'
+    try:
+        os.rename(path, aside)
+    except FileNotFoundError:
+        return None
+    return aside
+
+
+def put_back(aside, path):
+    """Возвращает чужую блокировку, если место ещё свободно."""
+    try:
+        os.link(aside, path)
+    except FileExistsError:
+        pass
+    os.remove(aside)
+
+
+def break_stale(path, timeout):
+    """Снимает брошенную блокировку; True — можно пробовать снова.
+
+    Файл сначала переименовывается: из нескольких воркеров это удаётся
+    одному, и он проверяет возраст уже своего файла. Если блокировку
+    между проверкой и переименованием взяли заново, она возвращается.
+    """
+    try:
+        if time.time() - os.path.getmtime(path) <= timeout:
+            return False
+    except FileNotFoundError:
+        return True
+    aside = move_aside(path)
+    if aside is None:
+        return True
+    if time.time() - os.path.getmtime(aside) > timeout:
+        os.remove(aside)
+        return True
+    put_back(aside, path)
+    return False
+
+
+def acquire(cache, key, timeout=LOCK_TIMEOUT):
+    path = lock_path(cache, key)
+    if path is None:
+        return cache.add(f'{key}:lock', 1, timeout)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    token = create_lock(path)
+    if token is None and break_stale(path, timeout):
+        token = create_lock(path)
+    if token is None:
+        return False
+    held()[key] = token
+    return True
+
+
+def release(cache, key):
+    path = lock_path(cache, key)
+    if path is None:
+        cache.delete(f'{key}:lock')
+        return
+    token = held().pop(key, None)
+    aside = move_aside(path) if token else None
+    if aside is None:
+        return
+    with open(aside, encoding='utf-8') as file:
+        owner = file.read()
+    if owner == token:
+        os.remove(aside)
+    else:
+        # Нашу блокировку сочли брошенной и уже взяли заново
+        put_back(aside, path)
+
+
+def refresh(cache, key, compute, timeout, grace):
+    try:
+        value = compute()
+        cache.set(key, (value, time.time() + timeout), timeout + grace)
+    finally:
+        release(cache, key)
+    return value
+
+
+def get_or_compute(key, compute, timeout, grace=None, wait=LOCK_WAIT):
+    """Возвращает значение из кэша, вычисляя его не больше одного раза.
+
+    timeout — срок свежести, grace — сколько ещё можно отдавать устаревшее
+    значение, пока другой воркер его пересчитывает (по умолчанию timeout).
+    """
+    cache = get_cache()
+    grace = timeout if grace is None else grace
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > time.time() or not acquire(cache, key):
+            return value
+        return refresh(cache, key, compute, timeout, grace)
+    if acquire(cache, key):
+        return refresh(cache, key, compute, timeout, grace)
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return compute()
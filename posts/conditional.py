@@ -0,0 +1,75 @@
+"""Условные GET-запросы для лент и страницы поста.
+
+ETag собирается из того, что уже загружено для страницы: (id, version)
+постов — version растёт при правке поста, комментарии и смене группы, —
+число постов в ленте, состояние текущего пользователя и его
+CSRF-cookie: формы на странице несут токен, и после нового входа
+закэшированная страница с прежним токеном дала бы 403. Если ETag
+совпал с If-None-Match, ответ 304 уходит без рендеринга шаблона.
+
+Last-Modified (самая поздняя pub_date на странице) отдаётся только для
+сведения: правка поста даты не меняет, поэтому проверяется один ETag.
+"""
+import calendar
+import hashlib
+
+from django.shortcuts import render
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from .counters import get_profile
+
+
+def user_state(user):
+    if not user.is_authenticated:
+        return None
+    # Меню показывает вкладку подписок только тем, кто на кого-то подписан
+    return (user.pk, user.username,
+            get_profile(user).following_count > 0)
+
+
+def make_etag(request, state, posts):
+    raw = repr((
+        request.get_full_path(),
+        user_state(request.user),
+        request.META.get('CSRF_COOKIE'),
+        state,
+        [(post.id, post.version) for post in posts],
+    ))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def page_state(paginator, page):
+    if getattr(page, 'cursor_mode', False):
+        return page.has_previous(), page.has_next()
+    return paginator.count
+
+
+def set_validators(request, response, etag, posts):
+    response['ETag'] = etag
+    dates = [post.pub_date for post in posts]
+    if dates:
+        response['Last-Modified'] = http_date(
+            calendar.timegm(max(dates).utctimetuple())
+        )
+    patch_vary_headers(response, ('Cookie',))
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def render_conditional(request, template_name, context, state=(),
+                       posts=()):
+    """render(), который отвечает 304, если страница не изменилась."""
+    if request.method not in ('GET', 'HEAD'):
+        return render(request, template_name, context)
+    posts = list(posts)
+    etag = make_etag(request, state, posts)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render(request, template_name, context)
+    return set_validators(request, response, etag, posts)
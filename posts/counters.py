@@ -0,0 +1,108 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным UPDATE ... SET x = x + 1 в той же транзакции,
+что и запись, которая их изменила. recount() пересчитывает их целиком
+и исправляет расхождения.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Profile
+
+from .models import Comment, Follow, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def get_profile(user):
+    """Профиль со счётчиками; если строки нет, создаёт её по таблицам.
+
+    Профиля может не быть у пользователей из фикстур, loaddata
+    и массовых вставок до recount().
+    """
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        profile, _ = Profile.objects.get_or_create(user=user, defaults={
+            'post_count': Post.objects.filter(author=user).count(),
+            'follower_count': Follow.objects.filter(author=user).count(),
+            'following_count': Follow.objects.filter(user=user).count(),
+        })
+        user.profile = profile
+        return profile
+
+
+def bump(queryset, field, delta, **extra):
+    value = F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+    queryset.update(**{field: value}, **extra)
+
+
+def bump_profile(user_id, field, delta):
+    bump(Profile.objects.filter(user_id=user_id), field, delta)
+
+
+def bump_comments(post_id, delta):
+    """Меняет счётчик комментариев и версию карточки поста одним UPDATE."""
+    bump(Post.objects.filter(pk=post_id), 'comment_count', delta,
+         version=F('version') + 1)
+
+
+def count_subquery(queryset, field, outer='pk'):
+    """Коррелированный COUNT(*) по связанной таблице для UPDATE."""
+    counts = (queryset.filter(**{field: OuterRef(outer)}).order_by()
+              .values(field).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recount_follows(user_ids):
+    """Пересчитывает счётчики подписок этих профилей по таблице Follow.
+
+    Для пакетной вставки: точное значение не зависит от того, какие
+    строки ignore_conflicts пропустил.
+    """
+    Profile.objects.filter(user_id__in=user_ids).update(
+        follower_count=count_subquery(Follow.objects, 'author', 'user_id'),
+        following_count=count_subquery(Follow.objects, 'user', 'user_id'),
+    )
+
+
+def recount(dry_run=False):
+    """Пересчитывает все счётчики; возвращает число исправленных строк."""
+    missing = User.objects.filter(profile__isnull=True)
+    drift = {'profiles': missing.count()}
+    if not dry_run:
+        Profile.objects.bulk_create(
+            [Profile(user_id=pk)
+             for pk in missing.values_list('pk', flat=True)],
+            batch_size=BATCH_SIZE,
+        )
+    profiles = Profile.objects.all()
+    targets = {
+        'comment_count': (
+            Post.objects.all(), count_subquery(Comment.objects, 'post')
+        ),
+        'post_count': (
+            profiles, count_subquery(Post.objects, 'author', 'user_id')
+        ),
+        'follower_count': (
+            profiles, count_subquery(Follow.objects, 'author', 'user_id')
+        ),
+        'following_count': (
+            profiles, count_subquery(Follow.objects, 'user', 'user_id')
+        ),
+    }
+    for field, (queryset, actual) in targets.items():
+        stale = (queryset.annotate(actual=actual)
+                 .exclude(**{field: F('actual')}))
+        if dry_run:
+            drift[field] = stale.count()
+            continue
+        ids = list(stale.values_list('pk', flat=True))
+        drift[field] = len(ids)
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            queryset.filter(pk__in=batch).update(**{field: actual})
+    return drift
@@ -0,0 +1,320 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Новый пост автора раскладывается в FeedEntry каждого подписчика, поэтому
+follow_index читает одну строку индекса (user, pub_date) вместо джойна
+Follow x Post. Посты «тяжёлых» авторов, у которых подписчиков больше
+POSTS_FANOUT_LIMIT, не раскладываются и подмешиваются при чтении; когда
+подписчиков снова становится не больше лимита, lighten() раскладывает
+его последние посты, иначе они пропали бы из лент.
+
+Лента читается срезом индекса (user, pub_date, post) вместе с постами,
+авторами и группами (FollowFeed), посты тяжёлых авторов вливаются
+в неё по тому же ключу (pub_date, id). Ленты длиннее POSTS_FEED_LENGTH
+обрезаются после раскладки: только те, у кого есть лишние записи.
+
+Все ленты строятся через feed_queryset, чтобы карточка поста
+рендерилась без дополнительных запросов.
+"""
+import heapq
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Q, Subquery
+
+from users.models import Profile
+
+from .models import FeedEntry, Follow, Post
+from .paginator import FORWARD, CursorPage, CursorPaginator
+
+# Лент в одном DELETE при обрезке
+TRIM_BATCH = 100
+
+
+def feed_queryset(queryset=None):
+    """Посты с автором и группой за один запрос.
+
+    Число комментариев хранится в Post.comment_count.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related('author', 'group')
+
+
+def feed_length():
+    return getattr(settings, 'POSTS_FEED_LENGTH', 500)
+
+
+def fanout_limit():
+    return getattr(settings, 'POSTS_FANOUT_LIMIT', 1000)
+
+
+def is_heavy(author_id):
+    return Profile.objects.filter(
+        user_id=author_id, follower_count__gt=fanout_limit()
+    ).exists()
+
+
+def heavy_authors(user):
+    """id авторов из подписок user, чьи посты читаются на лету."""
+    return list(
+        Follow.objects.filter(
+            user=user, author__profile__follower_count__gt=fanout_limit()
+        ).values_list('author', flat=True)
+    )
+
+
+def overflow(users):
+    """(user_id, pub_date, post_id) первой лишней записи в лентах users.
+
+    users — id пользователей или queryset с ними; ленты не длиннее
+    POSTS_FEED_LENGTH в результат не попадают. Для каждой ленты это один
+    проход по индексу (user, pub_date, post) без сортировки.
+    """
+    extra = (FeedEntry.objects.filter(user_id=OuterRef('pk'))
+             .order_by('-pub_date', '-post_id')
+             [feed_length():feed_length() + 1])
+    cuts = (get_user_model().objects.filter(pk__in=users)
+            .annotate(cut=Subquery(extra.values('id')))
+            .values_list('cut', flat=True))
+    cuts = [entry_id for entry_id in cuts if entry_id is not None]
+    if not cuts:
+        return []
+    return list(FeedEntry.objects.filter(pk__in=cuts)
+                .values_list('user_id', 'pub_date', 'post_id'))
+
+
+def trim(cutoffs):
+    """Удаляет записи лент начиная с первой лишней, см. overflow()."""
+    conditions = [
+        Q(user_id=user_id) & (Q(pub_date__lt=pub_date)
+                              | Q(pub_date=pub_date, post_id__lte=post_id))
+        for user_id, pub_date, post_id in cutoffs
+    ]
+    for start in range(0, len(conditions), TRIM_BATCH):
+        FeedEntry.objects.filter(
+            reduce(or_, conditions[start:start + TRIM_BATCH])
+        ).delete()
+
+
+def trim_feed(user_id):
+    """Оставляет в ленте пользователя не больше POSTS_FEED_LENGTH записей."""
+    trim(overflow([user_id]))
+
+
+def trim_followers(author_id):
+    """Обрезает переполненные ленты подписчиков автора."""
+    trim(overflow(Follow.objects.filter(author_id=author_id)
+                  .values('user_id')))
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_heavy(post.author_id):
+        return
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True).distinct()
+    )
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers],
+        ignore_conflicts=True,
+    )
+    trim_followers(post.author_id)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if is_heavy(author_id):
+        return
+    posts = (Post.objects.filter(author_id=author_id)
+             .order_by('-pub_date').values_list('id', 'pub_date')
+             [:feed_length()])
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True,
+    )
+    trim_feed(user_id)
+
+
+def lighten(author_id, batch_size=1000):
+    """Раскладывает посты автора, только что переставшего быть тяжёлым.
+
+    Пока подписчиков было больше POSTS_FANOUT_LIMIT, его посты читались
+    на лету и в ленты не попадали. Вызывается после уменьшения счётчика
+    подписчиков и срабатывает, только когда он дошёл ровно до лимита.
+    """
+    if not Profile.objects.filter(
+        user_id=author_id, follower_count=fanout_limit()
+    ).exists():
+        return
+    posts = list(Post.objects.filter(author_id=author_id)
+                 .order_by('-pub_date').values_list('id', 'pub_date')
+                 [:feed_length()])
+    followers = list(Follow.objects.filter(author_id=author_id)
+                     .values_list('user_id', flat=True))
+    step = max(1, batch_size // max(1, len(posts)))
+    for start in range(0, len(followers), step):
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+             for user_id in followers[start:start + step]
+             for post_id, pub_date in posts],
+            ignore_conflicts=True,
+        )
+    trim_followers(author_id)
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(batch_size=1000):
+    """Заново строит ленты всех подписчиков: два запроса на читателя.
+
+    Нужна после массовой вставки, которая не вызывает сигналы.
+    """
+    FeedEntry.objects.all().delete()
+    readers = (Follow.objects.order_by().values_list('user_id', flat=True)
+               .distinct().iterator())
+    for user_id in readers:
+        posts = (Post.objects.filter(author__following__user_id=user_id)
+                 .exclude(author__profile__follower_count__gt=fanout_limit())
+                 .order_by('-pub_date').values_list('id', 'pub_date')
+                 [:feed_length()])
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+             for post_id, pub_date in posts],
+            batch_size=batch_size,
+        )
+
+
+def window(queryset, pk, limit=None, after=None, before=None):
+    """Посты или записи ленты по ключу (pub_date, pk), новые сверху.
+
+    after — только старше этого ключа; before — только новее, ближайшие
+    к нему сначала.
+    """
+    if after is not None:
+        queryset = queryset.filter(
+            Q(pub_date__lt=after[0]) | Q(pub_date=after[0],
+                                         **{pk + '__lt': after[1]}))
+    if before is not None:
+        queryset = queryset.filter(
+            Q(pub_date__gt=before[0]) | Q(pub_date=before[0],
+                                          **{pk + '__gt': before[1]}))
+    if before is None:
+        queryset = queryset.order_by('-pub_date', '-' + pk)
+    else:
+        queryset = queryset.order_by('pub_date', pk)
+    return queryset if limit is None else queryset[:limit]
+
+
+def key(post):
+    return post.pub_date, post.pk
+
+
+class FollowFeed:
+    """Лента подписок пользователя для Paginator и FeedCursorPaginator.
+
+    Ведёт себя как последовательность постов: count() и срезы. Срез
+    читает записи FeedEntry одним диапазоном индекса вместе с постами
+    (select_related), а посты тяжёлых авторов — отдельным запросом,
+    и сливает оба потока.
+    """
+
+    def __init__(self, user, fields=None):
+        self.user = user
+        self.fields = fields
+        self._heavy = None
+        self._count = None
+
+    def only(self, *fields):
+        """Та же лента, из постов читаются только колонки fields."""
+        return FollowFeed(self.user, fields)
+
+    def heavy(self):
+        if self._heavy is None:
+            self._heavy = heavy_authors(self.user)
+        return self._heavy
+
+    def entries(self):
+        entries = FeedEntry.objects.filter(user=self.user).select_related(
+            'post__author', 'post__group')
+        if self.fields:
+            entries = entries.only(
+                'pub_date', 'post', *('post__' + name for name in self.fields))
+        return entries
+
+    def heavy_posts(self):
+        posts = feed_queryset(Post.objects.filter(author__in=self.heavy()))
+        if self.fields:
+            posts = posts.only(*self.fields)
+        return posts
+
+    def read(self, limit=None, after=None, before=None):
+        """Посты ленты как window(): не больше limit, новые сверху."""
+        streams = [[entry.post for entry in window(
+            self.entries(), 'post_id', limit, after, before)]]
+        if self.heavy():
+            streams.append(window(self.heavy_posts(), 'id', limit, after,
+                                  before))
+        if len(streams) == 1:
+            return streams[0]
+        merged = heapq.merge(*streams, key=key, reverse=before is None)
+        return list(islice(merged, limit))
+
+    def count(self):
+        if self._count is None:
+            self._count = FeedEntry.objects.filter(user=self.user).count()
+            if self.heavy():
+                self._count += Post.objects.filter(
+                    author__in=self.heavy()).count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def exists(self):
+        return bool(self.read(1))
+
+    def __iter__(self):
+        return iter(self.read())
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        if index.stop is None:
+            return self.read()[start:]
+        return self.read(max(index.stop, 0))[start:]
+
+
+class FeedCursorPaginator(CursorPaginator):
+    """Курсоры по FollowFeed: ключ (pub_date, id) поста."""
+
+    def get_page(self, cursor):
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None or position[0] == FORWARD:
+            after = position[1:] if position else None
+            items = self.object_list.read(self.per_page + 1, after=after)
+            return CursorPage(items[:self.per_page], self,
+                              len(items) > self.per_page,
+                              has_previous=position is not None)
+        items = self.object_list.read(self.per_page + 1,
+                                      before=position[1:])
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page]
+        items.reverse()
+        return CursorPage(items, self, True, has_previous)
+
+
+def follow_feed(user):
+    """Лента подписок пользователя, см. FollowFeed."""
+    return FollowFeed(user)
@@ -1,6 +1,9 @@
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
 from .models import Comment, Post
+from .uploads import sanitize
 
 
 class PostForm(ModelForm):
@@ -8,6 +11,18 @@ class PostForm(ModelForm):
         model = Post
         fields = ['text', 'group', 'image']
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean_image(self):
+        if 'image' in self.upload_errors:
+            raise ValidationError(self.upload_errors['image'])
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return sanitize(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,308 @@
+"""Счётчики запроса: SQL, шаблоны и кэш.
+
+RequestInstrumentationMiddleware на время запроса оборачивает все
+подключения к базе (execute_wrapper) и экземпляры кэшей этого потока,
+а рендеринг шаблонов учитывается через обёртку над Template.render
+бэкенда Django (install() из PostsConfig.ready). Собранное отдаётся
+заголовком Server-Timing (только с POSTS_SERVER_TIMING: он раскрывает
+клиентам устройство сайта) и одной JSON-строкой в лог posts.requests.
+
+С POSTS_TEMPLATE_PROFILE (YATUBE_TEMPLATE_PROFILE=1, по умолчанию
+выключен) учитывается каждый шаблон и каждый include: сколько раз
+отрисован, общее время и собственное время без вложенных include.
+Родитель {% extends %} отдельно не виден, его время входит в дочерний
+шаблон. Самые дорогие по собственному времени шаблоны
+попадают в Server-Timing (tpl-1, tpl-2, ...) и в JSON лога.
+
+Одинаковые по форме запросы (литералы и списки IN схлопнуты) считаются
+повторами: POSTS_DUPLICATE_QUERIES и больше одной формы — признак N+1.
+Запросы дольше POSTS_SLOW_REQUEST_MS с вероятностью
+POSTS_SLOW_REQUEST_SAMPLE попадают в лог posts.requests.slow вместе
+с самыми медленными и повторяющимися SQL.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+logger = logging.getLogger('posts.requests')
+slow_logger = logging.getLogger('posts.requests.slow')
+
+SLOWEST_QUERIES = 5
+TEMPLATE_TIMINGS = 3
+MAX_SQL_LENGTH = 2000
+
+_local = threading.local()
+_missing = object()
+
+IN_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+NUMBER_RE = re.compile(r'\b\d+\b')
+SPACE_RE = re.compile(r'\s+')
+
+
+def enabled():
+    return getattr(settings, 'POSTS_INSTRUMENTATION', True)
+
+
+def profile_templates():
+    return getattr(settings, 'POSTS_TEMPLATE_PROFILE', False)
+
+
+def duplicate_threshold():
+    return getattr(settings, 'POSTS_DUPLICATE_QUERIES', 3)
+
+
+def shape(sql):
+    """Форма запроса без значений: по ней ищутся повторы."""
+    sql = IN_LIST_RE.sub('(%s, ...)', sql)
+    sql = NUMBER_RE.sub('N', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.shapes = Counter()
+        self.slowest = []
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.profile = profile_templates()
+        if self.profile:
+            install_profiler()
+        # имя шаблона: [отрисовок, общее время, собственное время]
+        self.templates = {}
+        self._nested = []
+
+    def add_query(self, sql, params, duration):
+        self.queries += 1
+        self.sql_time += duration
+        self.shapes[shape(sql)] += 1
+        self.slowest.append((duration, sql, params))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[SLOWEST_QUERIES:]
+
+    def render_template(self, name, render, *args):
+        self._nested.append(0.0)
+        started = time.perf_counter()
+        try:
+            return render(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            entry = self.templates.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += elapsed - nested
+
+    def template_profile(self):
+        """Шаблоны по убыванию собственного времени."""
+        return [
+            {'name': name, 'count': count, 'ms': round(total * 1000, 2),
+             'self_ms': round(own * 1000, 2)}
+            for name, (count, total, own) in sorted(
+                self.templates.items(), key=lambda item: -item[1][2])
+        ]
+
+    def duplicates(self):
+        threshold = duplicate_threshold()
+        return {sql: count for sql, count in self.shapes.most_common()
+                if count >= threshold}
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        duplicates = self.duplicates()
+        templates = [
+            'tpl-%d;dur=%.1f;desc="%s x%d"' % (
+                rank, row['self_ms'], row['name'], row['count'])
+            for rank, row in enumerate(
+                self.template_profile()[:TEMPLATE_TIMINGS], 1)
+        ]
+        return ', '.join([
+            'db;dur=%.1f;desc="%d queries"' % (self.sql_time * 1000,
+                                               self.queries),
+            'dup;desc="%d shapes x%d"' % (
+                len(duplicates), sum(duplicates.values())),
+            'tpl;dur=%.1f' % (self.template_time * 1000),
+            'cache;desc="hit=%d miss=%d"' % (self.cache_hits,
+                                             self.cache_misses),
+            'total;dur=%.1f' % (self.total_time * 1000),
+        ] + templates)
+
+    def as_dict(self):
+        record = {
+            'ms': round(self.total_time * 1000, 1),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 1),
+            'duplicates': sum(self.duplicates().values()),
+            'template_ms': round(self.template_time * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+        if self.profile:
+            record['templates'] = self.template_profile()
+        return record
+
+
+def current():
+    """Счётчики текущего запроса или None вне запроса."""
+    return getattr(_local, 'stats', None)
+
+
+def query_wrapper(stats):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats.add_query(sql, params, time.perf_counter() - started)
+
+    return wrapper
+
+
+class CountingCache:
+    """Подменяет get/get_many экземпляра кэша на время запроса."""
+
+    def __init__(self, cache, stats):
+        self.cache = cache
+        self.stats = stats
+
+    def __enter__(self):
+        original_get = self.cache.get
+        original_get_many = self.cache.get_many
+        stats = self.stats
+
+        def get(key, default=None, version=None):
+            value = original_get(key, _missing, version=version)
+            if value is _missing:
+                stats.cache_misses += 1
+                return default
+            stats.cache_hits += 1
+            return value
+
+        def get_many(keys, version=None):
+            keys = list(keys)
+            found = original_get_many(keys, version=version)
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+            return found
+
+        self.cache.get = get
+        self.cache.get_many = get_many
+        return self
+
+    def __exit__(self, *exc_info):
+        del self.cache.get
+        del self.cache.get_many
+
+
+def install():
+    """Учитывает время рендеринга шаблонов Django в текущем запросе."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None:
+            return original(self, context, request)
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+    render.instrumented = True
+    Template.render = render
+
+
+def install_profiler():
+    """Оборачивает base.Template.render при первом профилируемом запросе.
+
+    Через него проходят и страница, и каждый include, поэтому без
+    POSTS_TEMPLATE_PROFILE он не трогается.
+    """
+    from django.template import base
+
+    if getattr(base.Template.render, 'instrumented', False):
+        return
+    original = base.Template.render
+
+    def render(self, context):
+        stats = current()
+        if stats is None or not stats.profile:
+            return original(self, context)
+        name = self.origin.template_name or self.name or '<string>'
+        return stats.render_template(name, original, self, context)
+
+    render.instrumented = True
+    base.Template.render = render
+
+
+def log_request(request, response, stats):
+    match = getattr(request, 'resolver_match', None)
+    record = dict(
+        stats.as_dict(),
+        method=request.method,
+        path=request.path,
+        view=match.view_name if match else None,
+        status=response.status_code,
+    )
+    logger.info(json.dumps(record, ensure_ascii=False))
+    threshold = getattr(settings, 'POSTS_SLOW_REQUEST_MS', 500)
+    sample = getattr(settings, 'POSTS_SLOW_REQUEST_SAMPLE', 1.0)
+    if record['ms'] < threshold or random.random() >= sample:
+        return
+    record['slowest'] = [
+        {'ms': round(duration * 1000, 1), 'sql': sql[:MAX_SQL_LENGTH],
+         'params': repr(params)[:MAX_SQL_LENGTH]}
+        for duration, sql, params in stats.slowest
+    ]
+    record['repeated'] = [
+        {'count': count, 'sql': sql[:MAX_SQL_LENGTH]}
+        for sql, count in stats.duplicates().items()
+    ]
+    slow_logger.warning(json.dumps(record, ensure_ascii=False))
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not enabled():
+            return self.get_response(request)
+        stats = RequestStats()
+        _local.stats = stats
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(query_wrapper(stats))
+                    )
+                for alias in settings.CACHES:
+                    stack.enter_context(CountingCache(caches[alias], stats))
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+        if getattr(settings, 'POSTS_SERVER_TIMING', False):
+            response['Server-Timing'] = stats.server_timing()
+        log_request(request, response, stats)
+        return response
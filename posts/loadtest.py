@@ -0,0 +1,258 @@
+"""Нагрузочный прогон основных страниц.
+
+Сценарии — лента, профиль, пост, лента подписок и добавление комментария
+— выполняются по кругу в нескольких потоках. Драйвер 'client' ходит через
+django.test.Client в том же процессе, драйвер 'wsgi' поднимает локальный
+многопоточный WSGI-сервер и шлёт настоящие HTTP-запросы. В обоих случаях
+считаются SQL-запросы на каждый ответ, а report() сводит пропускную
+способность, перцентили задержки и среднее число запросов к базе.
+
+Цели выбираются из данных: самый популярный автор, его последний пост
+и один из его подписчиков, от имени которого идут запросы со входом.
+"""
+import http.client
+import math
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from wsgiref.simple_server import (
+    WSGIRequestHandler, WSGIServer, make_server,
+)
+
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import Profile
+
+from .models import Follow
+
+SCENARIOS = ('index', 'profile', 'post', 'follow_index', 'add_comment')
+PERCENTILES = (50, 90, 99)
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+Sample = namedtuple('Sample', 'scenario status seconds queries')
+# form — страница с формой, которая выставляет cookie csrftoken
+Step = namedtuple('Step', 'method path data login form')
+
+
+def plan():
+    """Запросы сценариев и читатель, от имени которого они идут."""
+    profile = (Profile.objects.select_related('user')
+               .order_by('-follower_count').first())
+    if profile is None:
+        raise ValueError('В базе нет пользователей, сначала generate_data')
+    author = profile.user
+    post = author.posts.order_by('-pub_date').first()
+    follow = Follow.objects.filter(author=author).select_related(
+        'user').first()
+    if post is None or follow is None:
+        raise ValueError('У самого популярного автора нет постов '
+                         'или подписчиков')
+    post_args = (author.username, post.id)
+    steps = {
+        'index': Step('GET', reverse('index'), None, False, None),
+        'profile': Step('GET', reverse('profile', args=(author.username,)),
+                        None, False, None),
+        'post': Step('GET', reverse('post', args=post_args), None, False,
+                     None),
+        'follow_index': Step('GET', reverse('follow_index'), None, True,
+                             None),
+        'add_comment': Step('POST', reverse('add_comment', args=post_args),
+                            {'text': 'Комментарий под нагрузкой'}, True,
+                            reverse('post', args=post_args)),
+    }
+    return steps, follow.user
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Django в потоках процесса."""
+    name = 'client'
+
+    def __init__(self, user, logged_in=False):
+        self.user = user
+        self.logged_in = logged_in
+        self.local = threading.local()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def client(self, login):
+        attr = 'user_client' if login else 'guest_client'
+        client = getattr(self.local, attr, None)
+        if client is None:
+            client = Client()
+            if login:
+                client.force_login(self.user)
+            setattr(self.local, attr, client)
+        return client
+
+    def request(self, step):
+        client = self.client(step.login or self.logged_in)
+        with CaptureQueriesContext(connection) as queries:
+            if step.method == 'POST':
+                response = client.post(step.path, step.data)
+            else:
+                response = client.get(step.path)
+        return response.status_code, len(queries.captured_queries)
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def counting(application):
+    """WSGI-обёртка, отдающая число SQL-запросов в заголовке."""
+    def wrapper(environ, start_response):
+        count = [0]
+
+        def counter(execute, sql, params, many, context):
+            count[0] += 1
+            return execute(sql, params, many, context)
+
+        def counted_start_response(status, headers, exc_info=None):
+            headers.append((QUERY_COUNT_HEADER, str(count[0])))
+            return start_response(status, headers, exc_info)
+
+        with connection.execute_wrapper(counter):
+            return application(environ, counted_start_response)
+
+    return wrapper
+
+
+class WsgiDriver:
+    """Настоящие HTTP-запросы к локальному многопоточному серверу."""
+    name = 'wsgi'
+
+    def __init__(self, user, logged_in=False):
+        self.user = user
+        self.logged_in = logged_in
+        self.local = threading.local()
+        self.server = None
+
+    def start(self):
+        self.server = make_server(
+            '127.0.0.1', 0, counting(get_wsgi_application()),
+            server_class=ThreadingWSGIServer, handler_class=QuietHandler,
+        )
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        client = Client()
+        client.force_login(self.user)
+        self.session = client.cookies['sessionid'].value
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def send(self, method, path, cookies, body=None, headers=None):
+        host, port = self.server.server_address
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        headers = dict(headers or {})
+        if cookies:
+            headers['Cookie'] = '; '.join(
+                f'{name}={value}' for name, value in cookies.items()
+            )
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+            for header in response.headers.get_all('Set-Cookie') or ():
+                for name, morsel in SimpleCookie(header).items():
+                    cookies[name] = morsel.value
+            queries = int(response.getheader(QUERY_COUNT_HEADER, 0))
+            return response.status, queries, content
+        finally:
+            conn.close()
+
+    def cookies(self, login):
+        attr = 'user_cookies' if login else 'guest_cookies'
+        cookies = getattr(self.local, attr, None)
+        if cookies is None:
+            cookies = {'sessionid': self.session} if login else {}
+            setattr(self.local, attr, cookies)
+        return cookies
+
+    def request(self, step):
+        cookies = self.cookies(step.login or self.logged_in)
+        if step.method != 'POST':
+            status, queries, _ = self.send('GET', step.path, cookies)
+            return status, queries
+        if 'csrftoken' not in cookies and step.form:
+            self.send('GET', step.form, cookies)
+        status, queries, _ = self.send(
+            'POST', step.path, cookies, body=urlencode(step.data),
+            headers={
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-CSRFToken': cookies.get('csrftoken', ''),
+            },
+        )
+        return status, queries
+
+
+DRIVERS = {driver.name: driver for driver in (ClientDriver, WsgiDriver)}
+
+
+def run(driver, steps, requests=100, concurrency=4, scenarios=SCENARIOS):
+    """Выполняет requests запросов, возвращает (образцы, секунды)."""
+    order = [scenarios[i % len(scenarios)] for i in range(requests)]
+
+    def worker(scenario):
+        started = time.perf_counter()
+        status, queries = driver.request(steps[scenario])
+        return Sample(scenario, status, time.perf_counter() - started,
+                      queries)
+
+    driver.start()
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(worker, order))
+        elapsed = time.perf_counter() - started
+    finally:
+        driver.stop()
+    return samples, elapsed
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(rank / 100 * len(ordered)) - 1)]
+
+
+def summary(samples):
+    timings = [sample.seconds * 1000 for sample in samples]
+    row = {
+        'requests': len(samples),
+        'errors': sum(sample.status >= 400 for sample in samples),
+        'queries': sum(sample.queries for sample in samples) / len(samples),
+        'max': max(timings),
+    }
+    for rank in PERCENTILES:
+        row[f'p{rank}'] = percentile(timings, rank)
+    return row
+
+
+def report(samples, elapsed):
+    """Сводка по сценариям и итог: задержки в мс, запросы к базе."""
+    rows = {}
+    for scenario in dict.fromkeys(sample.scenario for sample in samples):
+        rows[scenario] = summary(
+            [sample for sample in samples if sample.scenario == scenario]
+        )
+    rows['total'] = summary(samples)
+    rows['total']['rps'] = len(samples) / elapsed
+    return rows
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import CHUNK_SIZE, export, tables
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии '
+            'и подписки в файлы JSON Lines')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов *.jsonl')
+        parser.add_argument(
+            '--tables', default=','.join(tables()),
+            help='Какие таблицы выгрузить, через запятую',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['tables'].split(',')]
+        unknown = set(names) - set(tables())
+        if unknown:
+            raise CommandError('Неизвестные таблицы: %s'
+                               % ', '.join(sorted(unknown)))
+        totals = export(options['directory'], names, options['chunk_size'])
+        for name, total in totals.items():
+            self.stdout.write(f'{name}: {total}')
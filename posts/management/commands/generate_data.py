@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from posts.synthetic import generate
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу синтетическими пользователями, постами, '
+            'комментариями и подписками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=3000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Сколько авторов читает каждый пользователь',
+        )
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Сколько разных картинок создать для постов',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.3,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора; от него зависят и имена пользователей',
+        )
+
+    def handle(self, *args, **options):
+        created = generate(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            image_share=options['image_share'],
+            seed=options['seed'],
+        )
+        for name, total in created.items():
+            self.stdout.write(f'{name}: {total}')
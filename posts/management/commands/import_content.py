@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import CHUNK_SIZE, load
+
+
+class Command(BaseCommand):
+    help = 'Загружает файлы JSON Lines, выгруженные export_content'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог с файлами *.jsonl')
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько строк вставлять одной транзакцией',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Сколько таблиц одного уровня грузить параллельно',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать заново, не продолжая прерванный импорт',
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, поиск и ленты после импорта',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size и --workers должны быть > 0')
+        loaded = load(
+            options['directory'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            resume=not options['restart'],
+            rebuild=not options['no_rebuild'],
+        )
+        for name, total in loaded.items():
+            self.stdout.write(f'{name}: {total}')
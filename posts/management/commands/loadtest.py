@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.loadtest import DRIVERS, SCENARIOS, plan, report, run
+
+
+class Command(BaseCommand):
+    help = ('Нагружает ленту, профиль, пост, подписки и комментарии; '
+            'печатает задержки и число запросов к базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--driver', choices=sorted(DRIVERS), default='client',
+            help='client — тестовый клиент, wsgi — локальный HTTP-сервер',
+        )
+        parser.add_argument(
+            '--scenarios', default=','.join(SCENARIOS),
+            help='Сценарии через запятую',
+        )
+        parser.add_argument(
+            '--logged-in', action='store_true',
+            help='Читать страницы под пользователем, мимо кэша анонимов',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',')]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError('Неизвестные сценарии: %s'
+                               % ', '.join(sorted(unknown)))
+        try:
+            steps, user = plan()
+        except ValueError as error:
+            raise CommandError(str(error))
+        driver = DRIVERS[options['driver']](user, options['logged_in'])
+        samples, elapsed = run(driver, steps, options['requests'],
+                               options['concurrency'], scenarios)
+        rows = report(samples, elapsed)
+        self.stdout.write(
+            f'{"сценарий":14}{"запросов":>9}{"ошибок":>8}{"p50":>9}'
+            f'{"p90":>9}{"p99":>9}{"max":>9}{"SQL":>7}'
+        )
+        for scenario, row in rows.items():
+            self.stdout.write(
+                f'{scenario:14}{row["requests"]:9}{row["errors"]:8}'
+                f'{row["p50"]:9.1f}{row["p90"]:9.1f}{row["p99"]:9.1f}'
+                f'{row["max"]:9.1f}{row["queries"]:7.1f}'
+            )
+        self.stdout.write(
+            f'{rows["total"]["rps"]:.1f} запросов/с за {elapsed:.1f} с '
+            f'({driver.name}, потоков: {options["concurrency"]})'
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.pagecache import reset_stats, stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша страниц'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода',
+        )
+
+    def handle(self, *args, **options):
+        counts = stats()
+        total = sum(counts.values())
+        for outcome, value in counts.items():
+            self.stdout.write(f'{outcome}: {value}')
+        if total:
+            self.stdout.write(f'hit ratio: {counts["hit"] / total:.1%}')
+        if options['reset']:
+            reset_stats()
@@ -0,0 +1,90 @@
+import json
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+
+class Collector(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(json.loads(record.getMessage()))
+
+
+class Command(BaseCommand):
+    help = ('Отрисовывает страницы и показывает время каждого шаблона '
+            'и include на запрос')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', metavar='url')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--user', help='Смотреть страницы под этим '
+                                           'пользователем')
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не очищать кэш фрагментов перед запросами',
+        )
+
+    def client(self, username):
+        client = Client()
+        if username:
+            user = get_user_model().objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Нет пользователя {username}')
+            client.force_login(user)
+        return client
+
+    def profile(self, client, url, repeat, warm):
+        logger = logging.getLogger('posts.requests')
+        collector = Collector()
+        handlers, level = logger.handlers, logger.level
+        logger.handlers = [collector]
+        logger.setLevel(logging.INFO)
+        try:
+            for _ in range(repeat):
+                if not warm:
+                    cache.clear()
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(
+                        f'{url}: ответ {response.status_code}')
+        finally:
+            logger.handlers = handlers
+            logger.setLevel(level)
+        return collector.records
+
+    def report(self, url, records):
+        totals = {}
+        for record in records:
+            for row in record['templates']:
+                total = totals.setdefault(row['name'], [0, 0.0, 0.0])
+                total[0] += row['count']
+                total[1] += row['ms']
+                total[2] += row['self_ms']
+        count = len(records)
+        self.stdout.write(
+            f'{url}: {sum(r["ms"] for r in records) / count:.1f} мс '
+            f'на запрос, из них шаблоны '
+            f'{sum(r["template_ms"] for r in records) / count:.1f} мс'
+        )
+        self.stdout.write(f'  {"шаблон":36}{"раз":>6}{"мс":>9}'
+                          f'{"своё, мс":>10}')
+        for name, (renders, ms, own) in sorted(
+                totals.items(), key=lambda item: -item[1][2]):
+            self.stdout.write(f'  {name:36}{renders / count:6.0f}'
+                              f'{ms / count:9.2f}{own / count:10.2f}')
+
+    def handle(self, *args, **options):
+        client = self.client(options['user'])
+        with override_settings(POSTS_INSTRUMENTATION=True,
+                               POSTS_TEMPLATE_PROFILE=True,
+                               POSTS_PAGE_CACHE=False):
+            for url in options['urls']:
+                records = self.profile(client, url, options['repeat'],
+                                       options['warm'])
+                self.report(url, records)
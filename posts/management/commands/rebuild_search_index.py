@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_backend, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов и групп'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild()
+        self.stdout.write(
+            f'Проиндексировано объектов: {total} ({get_backend().name})'
+        )
@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import run
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько миниатюр строить параллельно',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить миниатюры, даже если они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image=None)
+        if not options['force']:
+            posts = posts.filter(thumbnails='')
+        ids = posts.values_list('id', flat=True).iterator()
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for ok in pool.map(run, ids):
+                if ok:
+                    done += 1
+                else:
+                    failed += 1
+        self.stdout.write(f'Готово: {done}, с ошибками: {failed}')
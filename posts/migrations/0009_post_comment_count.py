@@ -0,0 +1,52 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field, outer):
+    counts = (queryset.filter(**{field: OuterRef(outer)}).order_by()
+              .values(field).annotate(total=Count('pk')).values('total'))
+    return Coalesce(
+        Subquery(counts, output_field=models.IntegerField()), 0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Profile = apps.get_model('users', 'Profile')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Profile.objects.bulk_create(
+        [Profile(user_id=pk) for pk in User.objects.filter(
+            profile__isnull=True).values_list('pk', flat=True)],
+        batch_size=500,
+    )
+    Post.objects.update(
+        comment_count=count_subquery(Comment.objects, 'post', 'pk')
+    )
+    Profile.objects.update(
+        post_count=count_subquery(Post.objects, 'author', 'user_id'),
+        follower_count=count_subquery(Follow.objects, 'author', 'user_id'),
+        following_count=count_subquery(Follow.objects, 'user', 'user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('posts', '0008_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def follow_count(Follow, field):
+    counts = (Follow.objects.filter(**{field: OuterRef('user_id')})
+              .order_by().values(field).annotate(total=Count('pk'))
+              .values('total'))
+    return Coalesce(
+        Subquery(counts, output_field=models.IntegerField()), 0
+    )
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('users', 'Profile')
+    duplicates = (Follow.objects.values('user', 'author').order_by()
+                  .annotate(first=Min('id'), total=Count('id'))
+                  .filter(total__gt=1))
+    if not duplicates.exists():
+        return
+    for row in duplicates.iterator():
+        Follow.objects.filter(
+            user=row['user'], author=row['author']
+        ).exclude(id=row['first']).delete()
+    Profile.objects.update(
+        follower_count=follow_count(Follow, 'author'),
+        following_count=follow_count(Follow, 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_follows,
+                             migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date', 'id'], name='post_date_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='follow_unique_user_author'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:48
+
+from django.db import DatabaseError, migrations, models
+
+FTS_TABLES = ('posts_post_fts', 'posts_group_fts')
+
+
+def create_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in FTS_TABLES:
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(body)'
+            )
+        except DatabaseError:
+            # SQLite собран без FTS5: поиск работает на SearchTerm
+            return
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in FTS_TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=5)),
+                ('object_id', models.PositiveIntegerField()),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['kind', 'term'], name='search_kind_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['kind', 'object_id'], name='search_kind_object_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
@@ -25,13 +28,30 @@ class Post(models.Model):
                               null=True, related_name='posts',
                               on_delete=models.SET_NULL)
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # JSON {размер: url} готовых миниатюр, см. posts.thumbnails
+    thumbnails = models.TextField(blank=True, default='', editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Меняется при каждом изменении поста; входит в ключ кэша карточки
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_date_idx'),
+            models.Index(fields=['-pub_date', 'id'],
+                         name='post_date_id_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def thumbnail_urls(self):
+        return json.loads(self.thumbnails) if self.thumbnails else {}
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -48,6 +68,24 @@ class Comment(models.Model):
     )
     text = models.TextField(verbose_name='Текст')
     created = models.DateTimeField(auto_now_add=True)
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        related_name='replies',
+        on_delete=models.CASCADE
+    )
+    # Пути предков и свой номер через точку, см. posts.threads
+    path = models.CharField(max_length=255, blank=True, default='',
+                            editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+            models.Index(fields=['post', 'path'],
+                         name='comment_post_path_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -59,3 +97,49 @@ class Follow(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='following')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='follow_unique_user_author'),
+        ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Материализованная лента подписок: запись на каждого подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        unique_together = ['user', 'post']
+        # Порядок ленты и ключ курсора (pub_date, post) — прямо из индекса
+        indexes = [models.Index(fields=['user', '-pub_date', '-post'],
+                                name='feed_user_date_post_idx')]
+
+
+class SearchTerm(models.Model):
+    """Обратный индекс поиска, если в SQLite нет FTS5, см. posts.search."""
+    kind = models.CharField(max_length=5)
+    object_id = models.PositiveIntegerField()
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'term'],
+                         name='search_kind_term_idx'),
+            models.Index(fields=['kind', 'object_id'],
+                         name='search_kind_object_idx'),
+        ]
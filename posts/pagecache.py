@@ -0,0 +1,118 @@
+"""Кэш целых страниц для анонимных читателей.
+
+Лента, группа, профиль и пост у всех анонимов одинаковы, поэтому ответ
+сохраняется целиком под ключом из пути и параметров страницы (page,
+cursor). Запросы вошедших пользователей идут мимо кэша. Записи постов,
+комментариев, подписок и групп сбрасывают пространство имён pages
+(posts.cache.invalidate), а повторный расчёт защищён от «стада»
+get_or_compute. Попадания и промахи считаются в кэше: stats().
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import escape_uri_path
+from django.utils.http import urlencode
+
+from .cache import get_cache, get_or_compute, invalidate, make_key
+
+NAMESPACE = 'pages'
+PAGE_PARAMS = ('page', 'cursor')
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+OUTCOMES = ('hit', 'miss')
+
+
+def enabled():
+    return getattr(settings, 'POSTS_PAGE_CACHE', True)
+
+
+def timeout():
+    return getattr(settings, 'POSTS_PAGE_CACHE_TIMEOUT', 300)
+
+
+def page_key(request):
+    params = [(name, request.GET[name]) for name in PAGE_PARAMS
+              if name in request.GET]
+    return make_key(NAMESPACE, escape_uri_path(request.path),
+                    urlencode(params))
+
+
+def invalidate_pages():
+    """Сбрасывает кэш страниц сейчас и ещё раз после коммита.
+
+    Второй сброс нужен, чтобы не осталась страница, которую параллельный
+    запрос успел закэшировать до коммита по старым данным.
+    """
+    invalidate(NAMESPACE)
+    transaction.on_commit(lambda: invalidate(NAMESPACE))
+
+
+def freeze(response):
+    return response.status_code, response.content, list(response.items())
+
+
+def thaw(frozen):
+    status, content, headers = frozen
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+def record(outcome):
+    cache = get_cache()
+    key = f'posts:pagecache:{outcome}'
+    if cache.add(key, 1, None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def stats():
+    cache = get_cache()
+    return {outcome: cache.get(f'posts:pagecache:{outcome}', 0)
+            for outcome in OUTCOMES}
+
+
+def reset_stats():
+    get_cache().delete_many(
+        [f'posts:pagecache:{outcome}' for outcome in OUTCOMES]
+    )
+
+
+def cache_anonymous(view):
+    """Отдаёт анонимам сохранённую копию страницы."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not enabled() or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+        missed = []
+
+        def compute():
+            # В кэш попадает полная страница, а не 304 для этого клиента
+            missed.append(True)
+            conditions = {header: request.META.pop(header)
+                          for header in CONDITIONAL_HEADERS
+                          if header in request.META}
+            try:
+                return freeze(view(request, *args, **kwargs))
+            finally:
+                request.META.update(conditions)
+
+        response = thaw(get_or_compute(page_key(request), compute,
+                                       timeout()))
+        outcome = 'miss' if missed else 'hit'
+        record(outcome)
+        if response.has_header('ETag'):
+            response = get_conditional_response(
+                request, etag=response['ETag'], response=response
+            ) or response
+        response['X-Page-Cache'] = outcome.upper()
+        return response
+
+    return wrapper
@@ -0,0 +1,196 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+from .cache import get_or_compute, make_key
+
+POSTS_PER_PAGE = 10
+# Окно номеров страниц: 1 … 47 48 [49] 50 51 … 5000
+WINDOW_EACH_SIDE = 2
+WINDOW_ENDS = 1
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class CursorPage:
+    """Страница ленты для CursorPaginator.
+
+    Повторяет интерфейс django.core.paginator.Page там, где это возможно,
+    но вместо номеров страниц отдаёт непрозрачные курсоры.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<CursorPage of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], FORWARD)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], BACKWARD)
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (pub_date, id) без COUNT и OFFSET.
+
+    Каждая страница — это один запрос вида
+    WHERE (pub_date, id) < (курсор) ORDER BY pub_date DESC, id DESC LIMIT n,
+    поэтому её стоимость не зависит от глубины.
+    """
+    date_field = 'pub_date'
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def encode_cursor(self, obj, direction):
+        value = '%s|%s|%s' % (
+            direction, getattr(obj, self.date_field).isoformat(), obj.pk
+        )
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode()).decode()
+            direction, date, pk = value.split('|')
+            date = datetime.fromisoformat(date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            return None
+        if direction not in (FORWARD, BACKWARD):
+            return None
+        return direction, date, pk
+
+    def get_page(self, cursor):
+        """Возвращает страницу по курсору; битый курсор — первая страница."""
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self._forward_page(self.object_list, has_previous=False)
+        direction, date, pk = position
+        if direction == FORWARD:
+            queryset = self.object_list.filter(
+                Q(**{self.date_field + '__lt': date})
+                | Q(**{self.date_field: date, 'pk__lt': pk})
+            )
+            return self._forward_page(queryset, has_previous=True)
+        queryset = self.object_list.filter(
+            Q(**{self.date_field + '__gt': date})
+            | Q(**{self.date_field: date, 'pk__gt': pk})
+        )
+        return self._backward_page(queryset)
+
+    def _forward_page(self, queryset, has_previous):
+        queryset = queryset.order_by('-' + self.date_field, '-pk')
+        items = list(queryset[:self.per_page + 1])
+        has_next = len(items) > self.per_page
+        return CursorPage(items[:self.per_page], self, has_next, has_previous)
+
+    def _backward_page(self, queryset):
+        queryset = queryset.order_by(self.date_field, 'pk')
+        items = list(queryset[:self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page]
+        items.reverse()
+        return CursorPage(items, self, True, has_previous)
+
+
+def cursor_mode(request):
+    """Курсорный режим включается настройкой или параметром ?cursor=."""
+    if 'cursor' in request.GET:
+        return True
+    return getattr(settings, 'POSTS_PAGINATION', 'offset') == 'cursor'
+
+
+def page_window(number, num_pages, on_each_side=WINDOW_EACH_SIDE,
+                on_ends=WINDOW_ENDS):
+    """Номера страниц вокруг текущей и по краям; None — пропуск «…»."""
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    if number > on_each_side + on_ends + 2:
+        window += list(range(1, on_ends + 1)) + [None]
+        start = number - on_each_side
+    else:
+        start = 1
+    if number < num_pages - on_each_side - on_ends - 1:
+        end = number + on_each_side
+        tail = [None] + list(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        end = num_pages
+        tail = []
+    return window + list(range(start, end + 1)) + tail
+
+
+def with_window(page):
+    """Кладёт в page.window окно номеров для includes/paginator.html."""
+    page.window = page_window(page.number, page.paginator.num_pages)
+    return page
+
+
+def count_mode():
+    return getattr(settings, 'POSTS_PAGINATION_COUNT', 'exact')
+
+
+def cached_count(queryset):
+    """COUNT(*) запроса, пересчитываемый не чаще раза в таймаут."""
+    key = make_key('counts', queryset.model._meta.label,
+                   str(queryset.order_by().query))
+    timeout = getattr(settings, 'POSTS_PAGINATION_COUNT_TIMEOUT', 300)
+    return get_or_compute(key, queryset.count, timeout)
+
+
+def paginate(request, object_list, per_page=POSTS_PER_PAGE, count=None,
+             cursor_class=CursorPaginator):
+    """Общая пагинация лент: возвращает пару (paginator, page).
+
+    В режиме POSTS_PAGINATION_COUNT = 'approximate' число объектов берётся
+    из count (например, денормализованного счётчика) или из кэша вместо
+    COUNT(*) на каждый запрос. Ленты не из QuerySet (FollowFeed) считают
+    себя сами.
+    """
+    if cursor_mode(request):
+        paginator = cursor_class(object_list, per_page)
+        return paginator, paginator.get_page(request.GET.get('cursor'))
+    paginator = Paginator(object_list, per_page)
+    if count_mode() == 'approximate':
+        if count is None and hasattr(object_list, 'query'):
+            count = cached_count(object_list)
+        if count is not None:
+            # count у Paginator — cached_property, значение можно подставить
+            paginator.count = count
+    return paginator, with_window(paginator.get_page(request.GET.get('page')))
@@ -0,0 +1,95 @@
+"""Бюджеты SQL-запросов на страницу для тестов.
+
+BUDGETS задаёт предел запросов для каждого имени URL при самом дорогом
+обращении: пользователь вошёл, кэши пусты. QueryBudget работает и как
+контекстный менеджер, и как декоратор теста; при превышении он падает
+со списком всех пойманных запросов. assert_constant_queries проверяет,
+что число запросов не растёт вместе с объёмом данных на странице.
+
+Этим пользуются и posts/tests, и pytest-набор в tests/ (фикстура
+query_budget).
+"""
+from contextlib import ContextDecorator
+
+from django.core.cache import caches
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+BUDGETS = {
+    'index': 5,
+    'group': 6,
+    'profile': 7,
+    'post': 6,
+    'post_comments': 5,
+    'follow_index': 7,
+    'search': 6,
+    'api:posts': 1,
+    'api:group_posts': 2,
+    'api:user_posts': 2,
+    'api:follow': 4,
+    'api:post': 1,
+    'api:comments': 2,
+    'api:user': 1,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def format_queries(queries):
+    return '\n'.join(f'{number}. {query["sql"]}'
+                     for number, query in enumerate(queries, 1))
+
+
+class QueryBudget(ContextDecorator):
+    """Не больше budget запросов внутри блока; budget — число или имя URL."""
+
+    def __init__(self, budget, using='default'):
+        self.name = budget if isinstance(budget, str) else None
+        self.budget = BUDGETS[budget] if self.name else budget
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        executed = len(self.context)
+        if executed > self.budget:
+            label = f'{self.name}: ' if self.name else ''
+            raise QueryBudgetExceeded(
+                f'{label}{executed} запросов при бюджете {self.budget}\n'
+                + format_queries(self.context.captured_queries)
+            )
+        return False
+
+
+def count_queries(fetch, using='default'):
+    """Запросы, сделанные fetch() при пустом кэше."""
+    for cache in caches.all():
+        cache.clear()
+    with CaptureQueriesContext(connections[using]) as context:
+        fetch()
+    return context.captured_queries
+
+
+def assert_constant_queries(fetch, grow, sizes=(1, 10, 30),
+                            using='default'):
+    """Число запросов fetch() одинаково после grow(size) для всех sizes."""
+    counts = {}
+    queries = None
+    for size in sizes:
+        grow(size)
+        queries = count_queries(fetch, using)
+        counts[size] = len(queries)
+    if len(set(counts.values())) > 1:
+        raise QueryBudgetExceeded(
+            f'Число запросов растёт с объёмом данных: {counts}\n'
+            + format_queries(queries)
+        )
+    return counts[sizes[0]]
@@ -0,0 +1,256 @@
+"""Полнотекстовый поиск по постам и группам.
+
+Текст разбивается на термы в Python (posts.tokenizer), поэтому
+индексатор и разбор запроса всегда нормализуют слова одинаково. Термы хранятся
+в виртуальных таблицах SQLite FTS5 (rowid = id объекта, ранжирование
+bm25), а если FTS5 недоступен — в обратном индексе на модели SearchTerm
+с ранжированием TF-IDF в Python. Индекс обновляется сигналами при
+создании, правке и удалении постов и групп.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Group, Post, SearchTerm
+from .tokenizer import tokenize, tokens
+
+SNIPPET_LENGTH = 200
+
+FTS_TABLES = {
+    'post': 'posts_post_fts',
+    'group': 'posts_group_fts',
+}
+
+
+def document(obj):
+    if isinstance(obj, Group):
+        return 'group', f'{obj.title}\n{obj.description}'
+    return 'post', obj.text
+
+
+class Fts5Backend:
+    name = 'fts5'
+
+    def index(self, kind, object_id, terms):
+        table = FTS_TABLES[kind]
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE rowid = %s',
+                           [object_id])
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, body) VALUES (%s, %s)',
+                [object_id, ' '.join(terms)]
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLES[kind]} WHERE rowid = %s',
+                           [object_id])
+
+    def clear(self, kind):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLES[kind]}')
+
+    def match(self, terms):
+        return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+    def count(self, kind, terms):
+        table = FTS_TABLES[kind]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {table} WHERE {table} MATCH %s',
+                [self.match(terms)]
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, kind, terms, offset, limit):
+        table = FTS_TABLES[kind]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match(terms), limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PythonBackend:
+    """Обратный индекс в таблице SearchTerm, ранжирование TF-IDF.
+
+    Ранжирование просматривает все совпавшие термы, поэтому его результат
+    запоминается на экземпляре: count() и search() одной выдачи
+    (SearchResults держит свой бэкенд) делают один проход по индексу.
+    """
+    name = 'python'
+
+    def __init__(self):
+        self._ranked = {}
+
+    def index(self, kind, object_id, terms):
+        self.remove(kind, object_id)
+        SearchTerm.objects.bulk_create([
+            SearchTerm(kind=kind, object_id=object_id, term=term,
+                       frequency=frequency)
+            for term, frequency in Counter(terms).items()
+        ])
+
+    def remove(self, kind, object_id):
+        self._ranked.clear()
+        SearchTerm.objects.filter(kind=kind, object_id=object_id).delete()
+
+    def clear(self, kind):
+        self._ranked.clear()
+        SearchTerm.objects.filter(kind=kind).delete()
+
+    def ranked(self, kind, terms):
+        key = (kind, frozenset(terms))
+        if key not in self._ranked:
+            self._ranked[key] = self.rank(kind, key[1])
+        return self._ranked[key]
+
+    def rank(self, kind, terms):
+        postings = defaultdict(dict)
+        rows = SearchTerm.objects.filter(kind=kind, term__in=terms)
+        for object_id, term, frequency in rows.values_list(
+                'object_id', 'term', 'frequency').iterator():
+            postings[object_id][term] = frequency
+        documents = SearchTerm.objects.filter(kind=kind).values(
+            'object_id').distinct().count()
+        frequency = Counter(term for found in postings.values()
+                            for term in found)
+        scores = {}
+        for object_id, found in postings.items():
+            if len(found) < len(terms):
+                continue
+            scores[object_id] = sum(
+                (1 + math.log(tf)) * math.log(1 + documents / frequency[term])
+                for term, tf in found.items()
+            )
+        return sorted(scores, key=lambda pk: (-scores[pk], -pk))
+
+    def count(self, kind, terms):
+        return len(self.ranked(kind, terms))
+
+    def search(self, kind, terms, offset, limit):
+        return self.ranked(kind, terms)[offset:offset + limit]
+
+
+_fts_databases = set()
+
+
+def fts5_ready():
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_databases:
+        try:
+            tables = connection.introspection.table_names()
+        except DatabaseError:
+            return False
+        if not set(FTS_TABLES.values()) <= set(tables):
+            return False
+        _fts_databases.add(name)
+    return True
+
+
+def get_backend():
+    choice = getattr(settings, 'POSTS_SEARCH_BACKEND', 'auto')
+    if choice == 'python' or (choice == 'auto' and not fts5_ready()):
+        return PythonBackend()
+    return Fts5Backend()
+
+
+def index_object(obj):
+    kind, text = document(obj)
+    get_backend().index(kind, obj.pk, tokenize(text))
+
+
+def remove_object(obj):
+    kind, _ = document(obj)
+    get_backend().remove(kind, obj.pk)
+
+
+def rebuild(batch_size=1000):
+    """Переиндексирует все посты и группы, возвращает их число."""
+    backend = get_backend()
+    total = 0
+    for model in (Group, Post):
+        kind = 'group' if model is Group else 'post'
+        backend.clear(kind)
+        for obj in model.objects.order_by().iterator(chunk_size=batch_size):
+            index_object(obj)
+            total += 1
+    return total
+
+
+def highlight(text, terms, length=SNIPPET_LENGTH):
+    """Отрывок текста вокруг первого совпадения с подсветкой <mark>."""
+    terms = set(terms)
+    matches = [match for match, term in tokens(text) if term in terms]
+    start = 0
+    if matches:
+        start = max(0, matches[0].start() - length // 4)
+    end = min(len(text), start + length)
+    parts = ['…' if start else '']
+    position = start
+    for match in matches:
+        if match.start() < start:
+            continue
+        if match.end() > end:
+            break
+        parts.append(escape(text[position:match.start()]))
+        parts.append('<mark>%s</mark>' % escape(match.group()))
+        position = match.end()
+    parts.append(escape(text[position:end]))
+    parts.append('…' if end < len(text) else '')
+    return mark_safe(''.join(parts))
+
+
+class SearchResults:
+    """Ленивая выдача поиска, которую можно отдать Paginator."""
+
+    def __init__(self, query, kind='post', queryset=None):
+        self.terms = tokenize(query)
+        self.kind = kind
+        self.queryset = queryset
+        self.backend = get_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = (self.backend.count(self.kind, self.terms)
+                           if self.terms else 0)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def ids(self, offset=0, limit=None):
+        if not self.terms:
+            return []
+        limit = self.count() if limit is None else limit
+        return self.backend.search(self.kind, self.terms, offset, limit)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        limit = (index.stop if index.stop is not None
+                 else self.count()) - offset
+        ids = self.ids(offset, max(limit, 0))
+        queryset = self.queryset
+        if queryset is None:
+            queryset = Group.objects.all() if self.kind == 'group' else (
+                Post.objects.select_related('author', 'group'))
+        objects = queryset.in_bulk(ids)
+        results = []
+        for pk in ids:
+            if pk not in objects:
+                continue
+            obj = objects[pk]
+            obj.snippet = highlight(document(obj)[1], self.terms)
+            results.append(obj)
+        return results
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import counters, feed, search, threads
+from .models import Comment, Follow, Group, Post
+from .pagecache import invalidate_pages
+
+
+# id удаляемых сейчас постов: их комментарии уходят каскадом, и менять
+# счётчик и версию карточки у исчезающего поста незачем
+deleting_posts = set()
+
+
+def card_cache_key(post):
+    return make_template_fragment_key('post_card', [post.id, post.version])
+
+
+@receiver(pre_save, sender=Post)
+def post_changed(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance.version += 1
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_object(instance)
+    invalidate_pages()
+    if created:
+        counters.bump_profile(instance.author_id, 'post_count', 1)
+        feed.fan_out(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    deleting_posts.add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    deleting_posts.discard(instance.pk)
+    counters.bump_profile(instance.author_id, 'post_count', -1)
+    cache.delete(card_cache_key(instance))
+    search.remove_object(instance)
+    invalidate_pages()
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_object(instance)
+    invalidate_pages()
+    if not created:
+        instance.posts.update(version=F('version') + 1)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Посты останутся без группы (SET_NULL) простым UPDATE, без сигналов
+    instance.posts.update(version=F('version') + 1)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    search.remove_object(instance)
+    invalidate_pages()
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        if not instance.path:
+            threads.assign_path(instance)
+        counters.bump_comments(instance.post_id, 1)
+        invalidate_pages()
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in deleting_posts:
+        return
+    counters.bump_comments(instance.post_id, -1)
+    invalidate_pages()
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_profile(instance.author_id, 'follower_count', 1)
+        counters.bump_profile(instance.user_id, 'following_count', 1)
+        feed.backfill(instance.user_id, instance.author_id)
+        invalidate_pages()
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_profile(instance.author_id, 'follower_count', -1)
+    counters.bump_profile(instance.user_id, 'following_count', -1)
+    feed.prune(instance.user_id, instance.author_id)
+    feed.lighten(instance.author_id)
+    invalidate_pages()
@@ -0,0 +1,98 @@
+"""Настройка соединений SQLite под нагрузкой.
+
+На каждое новое соединение (сигнал connection_created) выполняются
+PRAGMA из POSTS_SQLITE_PRAGMAS:
+
+* journal_mode=WAL — читатели не блокируют писателя и наоборот, запись
+  одна на всю базу, но без ожидания чтений;
+* synchronous=NORMAL — в WAL fsync только на контрольных точках,
+  закоммиченное не теряется при падении процесса, только при сбое ОС;
+* busy_timeout — сколько миллисекунд ждать чужую блокировку записи,
+  прежде чем отдать «database is locked»;
+* mmap_size, cache_size, temp_store — чтение через отображение файла,
+  кэш страниц на соединение и временные таблицы сортировок в памяти.
+
+journal_mode хранится в самом файле базы, остальные действуют только
+на соединение — поэтому вместе с ними нужен CONN_MAX_AGE, иначе каждый
+запрос заново открывает файл и платит за настройку. Для базы в памяти
+(тесты) journal_mode не меняется.
+
+busy_timeout не спасает транзакцию, которая сначала читает, а потом
+пишет: если между чтением и записью базу изменил другой процесс, SQLite
+сразу отвечает «database is locked». Поэтому с POSTS_SQLITE_BEGIN =
+'IMMEDIATE' transaction.atomic() начинается с BEGIN IMMEDIATE —
+блокировка записи берётся в самом начале, с ожиданием busy_timeout.
+Базы в памяти этот режим не получают.
+
+PRAGMA выполняются на «сыром» курсоре драйвера и не попадают в счётчики
+запросов и бюджеты.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# journal_mode меняется первым: остальные PRAGMA от него не зависят,
+# а busy_timeout должен действовать до первой записи
+ORDER = ('journal_mode', 'busy_timeout', 'synchronous', 'mmap_size',
+         'cache_size', 'temp_store')
+
+
+def pragmas():
+    return getattr(settings, 'POSTS_SQLITE_PRAGMAS', {})
+
+
+def begin_mode():
+    return getattr(settings, 'POSTS_SQLITE_BEGIN', None)
+
+
+def order(name):
+    return ORDER.index(name) if name in ORDER else len(ORDER)
+
+
+def apply(connection, values=None):
+    """Выполняет PRAGMA на открытом соединении SQLite."""
+    values = pragmas() if values is None else values
+    cursor = connection.connection.cursor()
+    try:
+        for name in sorted(values, key=order):
+            if name == 'journal_mode' and connection.is_in_memory_db():
+                continue
+            cursor.execute(f'PRAGMA {name} = {values[name]}')
+    finally:
+        cursor.close()
+
+
+def current(connection, names=ORDER):
+    """Действующие значения PRAGMA соединения.
+
+    None — PRAGMA не действует для этой базы (mmap_size в памяти).
+    """
+    connection.ensure_connection()
+    cursor = connection.connection.cursor()
+    values = {}
+    try:
+        for name in names:
+            row = cursor.execute(f'PRAGMA {name}').fetchone()
+            values[name] = row[0] if row else None
+        return values
+    finally:
+        cursor.close()
+
+
+def begin_with(connection, mode):
+    """BEGIN <mode> вместо BEGIN в начале transaction.atomic()."""
+    def start_transaction():
+        connection.cursor().execute(f'BEGIN {mode}')
+
+    connection._start_transaction_under_autocommit = start_transaction
+
+
+@receiver(connection_created)
+def configure(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    if pragmas():
+        apply(connection)
+    # В общей памяти тестовой базы блокировки таблиц не ждут busy_timeout
+    if begin_mode() and not connection.is_in_memory_db():
+        begin_with(connection, begin_mode())
@@ -0,0 +1,152 @@
+"""Синтетические данные для нагрузочных тестов.
+
+generate() наполняет базу пользователями, группами, постами с текстом
+и картинками, комментариями и подписками. Граф подписок степенной:
+авторов выбирают с весом 1 / rank ** FOLLOW_SKEW, поэтому у немногих
+авторов тысячи подписчиков, а у большинства — единицы, как в живой
+соцсети. Всё вставляется bulk_create пачками; даты постов и комментариев
+разнесены по последним DAYS дням. Счётчики, поиск и ленты подписок
+после вставки достраивает transfer.finish().
+"""
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import Comment, Follow, Group, Post
+from .transfer import explicit_dates, finish
+
+BATCH_SIZE = 1000
+DAYS = 365
+FOLLOW_SKEW = 1.2
+PASSWORD = 'password'
+
+WORDS = (
+    'котик', 'собака', 'прогулка', 'город', 'дорога', 'фотография', 'книга',
+    'утро', 'вечер', 'погода', 'работа', 'друзья', 'музыка', 'поездка',
+    'море', 'лес', 'солнце', 'дождь', 'кофе', 'завтрак', 'выходные', 'кино',
+    'гулять', 'читать', 'слушать', 'смотреть', 'думать', 'писать', 'ехать',
+    'красивый', 'новый', 'старый', 'тёплый', 'холодный', 'долгий', 'быстро',
+    'сегодня', 'вчера', 'снова', 'очень', 'наконец', 'и', 'в', 'на', 'с',
+)
+
+
+def sentence(rnd):
+    words = rnd.choices(WORDS, k=rnd.randint(4, 12))
+    return ' '.join(words).capitalize() + '.'
+
+
+def text(rnd):
+    return ' '.join(sentence(rnd) for _ in range(rnd.randint(1, 6)))
+
+
+def follow_weights(count):
+    """Накопленные веса авторов для random.choices(cum_weights=...)."""
+    return list(accumulate(1 / rank ** FOLLOW_SKEW
+                           for rank in range(1, count + 1)))
+
+
+def make_images(count, rnd):
+    """Сохраняет count картинок; посты ссылаются на них повторно."""
+    names = []
+    for i in range(count):
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        buffer = BytesIO()
+        Image.new('RGB', (800, 600), color).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            f'posts/synthetic-{i}.jpg', ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+def batched(objects, model):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def generate(users=100, groups=10, posts=1000, comments=3000,
+             follows=20, images=10, image_share=0.3, seed=0, rebuild=True):
+    """Создаёт набор данных, возвращает число созданных объектов."""
+    rnd = random.Random(seed)
+    User = get_user_model()
+    now = timezone.now()
+    prefix = f'synthetic{seed}_'
+    password = make_password(PASSWORD)
+
+    def moment():
+        return now - timedelta(seconds=rnd.randrange(DAYS * 24 * 3600))
+
+    with transaction.atomic():
+        batched((User(username=f'{prefix}{i}', password=password)
+                 for i in range(users)), User)
+        user_ids = list(User.objects.filter(
+            username__startswith=prefix
+        ).order_by('pk').values_list('pk', flat=True))
+        batched((Group(title=f'Группа {i}', slug=f'{prefix}group-{i}',
+                       description=text(rnd)) for i in range(groups)), Group)
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'{prefix}group-'
+        ).values_list('pk', flat=True))
+        image_names = make_images(images, rnd)
+        # Пишут тоже в основном популярные авторы
+        weights = follow_weights(len(user_ids))
+
+        def popular():
+            return rnd.choices(user_ids, cum_weights=weights)[0]
+
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            batched((Post(
+                text=text(rnd),
+                author_id=popular(),
+                group_id=(rnd.choice(group_ids)
+                          if group_ids and rnd.random() < 0.5 else None),
+                image=(rnd.choice(image_names)
+                       if image_names and rnd.random() < image_share
+                       else None),
+                pub_date=moment(),
+            ) for _ in range(posts)), Post)
+        post_ids = list(Post.objects.filter(
+            author__username__startswith=prefix
+        ).values_list('pk', flat=True))
+        with explicit_dates(Comment._meta.get_field('created')):
+            batched((Comment(
+                post_id=rnd.choice(post_ids),
+                author_id=rnd.choice(user_ids),
+                text=sentence(rnd),
+                created=moment(),
+            ) for _ in range(comments if post_ids else 0)), Comment)
+        pairs = set()
+        for user_id in user_ids:
+            wanted = len(pairs) + min(follows, len(user_ids) - 1)
+            # Хвост распределения выпадает редко: попыток ограниченное число
+            for _ in range(follows * 10):
+                if len(pairs) == wanted:
+                    break
+                author_id = popular()
+                if author_id != user_id:
+                    pairs.add((user_id, author_id))
+        batched((Follow(user_id=user_id, author_id=author_id)
+                 for user_id, author_id in pairs), Follow)
+        if rebuild:
+            finish()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_ids),
+        'comments': comments if post_ids else 0,
+        'follows': len(pairs),
+    }
@@ -0,0 +1,72 @@
+"""Предкомпиляция шаблонов при старте процесса.
+
+С YATUBE_TEMPLATE_CACHE=1 (и всегда при DEBUG=False) шаблоны грузит
+django.template.loaders.cached.Loader: каждый файл читается
+и компилируется один раз на процесс. Без прогрева первый запрос
+к каждой странице всё равно платит за разбор страницы и всех её
+include — warm_up() заранее компилирует все шаблоны проекта
+и приложений. PostsConfig.ready вызывает его при POSTS_TEMPLATE_WARMUP.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.loaders.cached import Loader as CachedLoader
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def engine():
+    return engines['django'].engine
+
+
+def is_cached(template_engine=None):
+    """Используется ли кэширующий загрузчик."""
+    template_engine = template_engine or engine()
+    return any(isinstance(loader, CachedLoader)
+               for loader in template_engine.template_loaders)
+
+
+def template_dirs(template_engine):
+    """Каталоги, которые обходят загрузчики движка, в порядке поиска."""
+    directories = []
+    for loader in template_engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            directories.extend(getattr(inner, 'get_dirs', list)())
+    return directories
+
+
+def template_names(template_engine=None):
+    """Имена всех шаблонов из DIRS и каталогов templates приложений."""
+    template_engine = template_engine or engine()
+    names = {}
+    for directory in template_dirs(template_engine):
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, directory)
+                    names.setdefault(name.replace(os.sep, '/'), None)
+    return list(names)
+
+
+def warm_up(template_engine=None):
+    """Компилирует все шаблоны в кэш загрузчика.
+
+    Возвращает число скомпилированных шаблонов; шаблоны с ошибками
+    (например, из приложения без нужной библиотеки тегов) пропускаются.
+    """
+    template_engine = template_engine or engine()
+    if not is_cached(template_engine):
+        return 0
+    compiled = 0
+    for name in template_names(template_engine):
+        try:
+            template_engine.get_template(name)
+        except TemplateSyntaxError as error:
+            logger.warning('Шаблон %s не скомпилирован: %s', name, error)
+        else:
+            compiled += 1
+    return compiled
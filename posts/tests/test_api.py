@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username='user', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.user,
+                group=cls.group if i % 2 else None
+            )
+            for i in range(15)
+        ]
+        cls.post = cls.posts[-1]
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        self.client = Client()
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(f'api:{name}', args=args), params)
+        return response.status_code, response.json()
+
+    def walk(self, name, *args, **params):
+        ids, cursor = [], None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            status, data = self.get(name, *args, **params)
+            self.assertEqual(status, 200)
+            ids += [item['id'] for item in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                return ids
+
+    def test_feeds_walk_all_posts_by_cursor(self):
+        expected = [post.id for post in reversed(self.posts)]
+        self.assertEqual(self.walk('posts', limit=4), expected)
+        self.assertEqual(self.walk('user_posts', 'user'), expected)
+        self.assertEqual(
+            self.walk('group_posts', 'group'),
+            [post.id for post in reversed(self.posts[1::2])]
+        )
+
+    def test_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:posts'))
+
+    def test_post_fields(self):
+        status, data = self.get('post', self.post.id)
+        self.assertEqual(status, 200)
+        self.assertEqual(data['author'], 'user')
+        self.assertEqual(data['group'], None)
+        self.assertEqual(data['comment_count'], 3)
+        self.assertEqual(
+            data['url'], reverse('post', args=('user', self.post.id))
+        )
+
+    def test_sparse_fieldsets(self):
+        status, data = self.get('posts', fields='id,text', limit=2)
+        self.assertEqual(
+            data['results'][0], {'id': self.post.id, 'text': self.post.text}
+        )
+        status, data = self.get('posts', fields='id,password')
+        self.assertEqual(status, 400)
+
+    def test_comments(self):
+        status, data = self.get('comments', self.post.id, limit=2)
+        self.assertEqual(
+            [item['text'] for item in data['results']],
+            ['Комментарий 2', 'Комментарий 1']
+        )
+        self.assertEqual(data['results'][0]['author'], 'reader')
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(self.get('comments', 0)[0], 404)
+
+    def test_user_detail(self):
+        status, data = self.get('user', 'user')
+        self.assertEqual(data['full_name'], 'Лев Толстой')
+        self.assertEqual(data['post_count'], 15)
+        self.assertEqual(self.get('user', 'nobody')[0], 404)
+
+    def test_follow_feed_requires_login(self):
+        self.assertEqual(self.get('follow')[0], 401)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.client.force_login(self.reader)
+        status, data = self.get('follow', limit=100)
+        self.assertEqual(len(data['results']), 15)
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from posts import cache as posts_cache
+
+CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+    }
+})
+class SharedCacheTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        posts_cache.get_cache().clear()
+
+    def test_invalidate_namespace_changes_keys(self):
+        key = posts_cache.make_key('index', 'page', 1)
+        posts_cache.get_cache().set(key, 'value')
+        self.assertEqual(posts_cache.make_key('index', 'page', 1), key)
+        posts_cache.invalidate('index')
+        new_key = posts_cache.make_key('index', 'page', 1)
+        self.assertNotEqual(new_key, key)
+        self.assertIsNone(posts_cache.get_cache().get(new_key))
+
+    def test_long_keys_are_hashed(self):
+        key = posts_cache.make_key('index', 'x' * 500)
+        self.assertLess(len(key), 100)
+
+    def test_value_is_computed_once_under_concurrency(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'page'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                posts_cache.get_or_compute('k', compute, timeout=60)
+            ))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['page'] * 10)
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_value_served_while_refreshing(self):
+        cache = posts_cache.get_cache()
+        cache.set('k', ('old', time.time() - 1), 60)
+        self.assertTrue(posts_cache.acquire(cache, 'k'))
+        value = posts_cache.get_or_compute('k', lambda: 'new', timeout=60)
+        self.assertEqual(value, 'old')
+        posts_cache.release(cache, 'k')
+        value = posts_cache.get_or_compute('k', lambda: 'new', timeout=60)
+        self.assertEqual(value, 'new')
+        self.assertEqual(cache.get('k')[0], 'new')
+
+    def test_stale_lock_is_broken(self):
+        cache = posts_cache.get_cache()
+        self.assertTrue(posts_cache.acquire(cache, 'k'))
+        self.assertFalse(posts_cache.acquire(cache, 'k'))
+        path = posts_cache.lock_path(cache, 'k')
+        old = time.time() - posts_cache.LOCK_TIMEOUT - 1
+        os.utime(path, (old, old))
+        self.assertTrue(posts_cache.acquire(cache, 'k'))
+        posts_cache.release(cache, 'k')
+        self.assertFalse(os.path.exists(path))
+
+    def test_release_keeps_lock_taken_by_another_worker(self):
+        cache = posts_cache.get_cache()
+        self.assertTrue(posts_cache.acquire(cache, 'k'))
+        path = posts_cache.lock_path(cache, 'k')
+        # Пока мы считали, блокировку сочли брошенной и взяли заново
+        with open(path, 'w') as file:
+            file.write('other')
+        posts_cache.release(cache, 'k')
+        self.assertTrue(os.path.exists(path))
+        os.remove(path)
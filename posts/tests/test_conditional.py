@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def urls(self):
+        return [
+            reverse('index'),
+            reverse('group', args=(self.group.slug,)),
+            reverse('profile', args=(self.user.username,)),
+            reverse('post', args=(self.user.username, self.post.id)),
+        ]
+
+    def etags(self):
+        return [self.client.get(url)['ETag'] for url in self.urls()]
+
+    def test_not_modified_skips_rendering(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertTrue(first.has_header('Last-Modified'))
+                second = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=first['ETag']
+                )
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second.templates, [])
+                self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_edit_changes_etag(self):
+        before = self.etags()
+        post = Post.objects.get(id=self.post.id)
+        post.text = 'Новый текст'
+        post.save()
+        for old, new in zip(before, self.etags()):
+            self.assertNotEqual(old, new)
+
+    def test_comment_changes_post_etag(self):
+        url = reverse('post', args=(self.user.username, self.post.id))
+        before = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=before)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Да')
+
+    def test_new_post_and_delete_change_index_etag(self):
+        url = reverse('index')
+        first = self.client.get(url)['ETag']
+        post = Post.objects.create(text='Ещё', author=self.user)
+        second = self.client.get(url)['ETag']
+        self.assertNotEqual(first, second)
+        post.delete()
+        self.assertNotEqual(second, self.client.get(url)['ETag'])
+
+    def test_follow_changes_profile_etag(self):
+        self.client.force_login(self.reader)
+        url = reverse('profile', args=(self.user.username,))
+        before = self.client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertNotEqual(before, self.client.get(url)['ETag'])
+
+    def test_users_get_own_etags_and_private_cache(self):
+        anonymous = self.client.get(reverse('index'))
+        self.assertIn('public', anonymous['Cache-Control'])
+        self.assertIn('Cookie', anonymous['Vary'])
+        self.client.force_login(self.reader)
+        response = self.client.get(
+            reverse('index'), HTTP_IF_NONE_MATCH=anonymous['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotEqual(response['ETag'], anonymous['ETag'])
+
+    def test_new_csrf_token_changes_etag(self):
+        self.client.force_login(self.reader)
+        url = reverse('post', args=(self.user.username, self.post.id))
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        # Выход и вход меняют CSRF-cookie
+        self.client.cookies['csrftoken'] = 'x' * 64
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
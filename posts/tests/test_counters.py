@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.querybudget import assert_constant_queries
+from users.models import Profile
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username='author')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def test_write_paths_maintain_counters(self):
+        self.author_client.post(reverse('new_post'), data={'text': 'Пост'})
+        post = Post.objects.get(text='Пост')
+        self.assertEqual(self.profile(self.author).post_count, 1)
+
+        self.reader_client.post(
+            reverse('add_comment', args=(self.author, post.id)),
+            data={'text': 'Комментарий'}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+        self.reader_client.get(reverse('profile_follow', args=(self.author,)))
+        self.assertEqual(self.profile(self.author).follower_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('profile_unfollow', args=(self.author,))
+        )
+        self.assertEqual(self.profile(self.author).follower_count, 0)
+        self.assertEqual(self.profile(self.reader).following_count, 0)
+
+        self.author_client.get(reverse('delete_post', args=(self.author,
+                                                            post.id)))
+        self.assertFalse(Post.objects.filter(id=post.id).exists())
+        self.assertEqual(self.profile(self.author).post_count, 0)
+
+    def test_profile_reads_stored_counters(self):
+        Post.objects.create(text='Пост', author=self.author)
+        response = self.reader_client.get(
+            reverse('profile', args=(self.author,))
+        )
+        self.assertEqual(response.context.get('count'), 1)
+
+    def test_recount_repairs_drift(self):
+        Post.objects.create(text='Пост', author=self.author)
+        Profile.objects.filter(user=self.author).update(post_count=7)
+        Profile.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('post_count: 1', out.getvalue())
+        self.assertIn('profiles: 1', out.getvalue())
+        self.assertEqual(self.profile(self.author).post_count, 1)
+        self.assertTrue(Profile.objects.filter(user=self.reader).exists())
+
+    def test_user_without_profile(self):
+        user = get_user_model().objects.create_user(username='loaded')
+        post = Post.objects.create(text='Пост', author=user)
+        # Как после loaddata или сырой вставки: профиля нет
+        Profile.objects.filter(user=user).delete()
+        client = Client()
+        client.force_login(get_user_model().objects.get(pk=user.pk))
+        for url in (reverse('index'), reverse('profile', args=(user,)),
+                    reverse('post', args=(user, post.id)),
+                    reverse('api:user', args=(user,))):
+            with self.subTest(url=url):
+                self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(self.profile(user).post_count, 1)
+
+    def test_post_delete_does_not_query_per_comment(self):
+        def grow(size):
+            post = Post.objects.create(text='Пост', author=self.author)
+            root = Comment.objects.create(post=post, author=self.reader,
+                                          text='Корень')
+            for i in range(size - 1):
+                Comment.objects.create(post=post, author=self.reader,
+                                       text=f'Ответ {i}', parent=root)
+
+        def delete():
+            Post.objects.get().delete()
+
+        assert_constant_queries(delete, grow, sizes=(1, 10, 50))
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(self.profile(self.author).post_count, 0)
@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed
+from posts.feed import follow_feed
+from posts.models import FeedEntry, Follow, Post
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username='author')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author_client.post(reverse('new_post'), data={'text': 'Пост'})
+        post = Post.objects.get(text='Пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual(response.context.get('page')[0], post)
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+        self.reader_client.get(reverse(
+            'profile_follow', kwargs={'username': self.author}
+        ))
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 3)
+        self.reader_client.get(reverse(
+            'profile_unfollow', kwargs={'username': self.author}
+        ))
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertFalse(follow_feed(self.reader).exists())
+
+    @override_settings(POSTS_FEED_LENGTH=2)
+    def test_feed_is_trimmed(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=f'Пост {i}', author=self.author)
+                 for i in range(4)]
+        entries = FeedEntry.objects.filter(user=self.reader)
+        self.assertEqual(
+            sorted(entries.values_list('post_id', flat=True)),
+            [posts[2].id, posts[3].id]
+        )
+
+    @override_settings(POSTS_FANOUT_LIMIT=0)
+    def test_heavy_author_is_read_on_the_fly(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+
+    @override_settings(POSTS_FEED_LENGTH=2)
+    def test_fan_out_trims_every_follower(self):
+        other = get_user_model().objects.create_user(username='other')
+        for user in (self.reader, other):
+            Follow.objects.create(user=user, author=self.author)
+        posts = [Post.objects.create(text=f'Пост {i}', author=self.author)
+                 for i in range(3)]
+        for user in (self.reader, other):
+            self.assertEqual(
+                sorted(FeedEntry.objects.filter(user=user)
+                       .values_list('post_id', flat=True)),
+                [posts[1].id, posts[2].id]
+            )
+
+    @override_settings(POSTS_FANOUT_LIMIT=1)
+    def test_heavy_era_posts_stay_after_author_gets_light(self):
+        other = get_user_model().objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+
+    @override_settings(POSTS_FANOUT_LIMIT=1)
+    def test_heavy_posts_merge_into_pages(self):
+        heavy = get_user_model().objects.create_user(username='heavy')
+        other = get_user_model().objects.create_user(username='other')
+        for user, author in ((self.reader, self.author),
+                             (self.reader, heavy), (other, heavy)):
+            Follow.objects.create(user=user, author=author)
+        posts = [Post.objects.create(text=f'Пост {i}',
+                                     author=(heavy, self.author)[i % 2])
+                 for i in range(5)]
+        newest = posts[::-1]
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(),
+                         2)
+        reader_feed = follow_feed(self.reader)
+        self.assertEqual(reader_feed.count(), 5)
+        self.assertEqual(reader_feed[1:4], newest[1:4])
+        pages, cursor = [], ''
+        while cursor is not None:
+            data = self.reader_client.get(
+                reverse('api:follow'),
+                {'limit': 2, 'fields': 'id', 'cursor': cursor},
+            ).json()
+            pages.append([row['id'] for row in data['results']])
+            cursor = data['next']
+        self.assertEqual(pages, [[post.id for post in newest[i:i + 2]]
+                                 for i in (0, 2, 4)])
+
+    @override_settings(POSTS_FEED_LENGTH=2)
+    def test_trim_touches_only_long_feeds(self):
+        other = get_user_model().objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=f'Пост {i}', author=self.author)
+                 for i in range(3)]
+        Follow.objects.create(user=other, author=self.author)
+        FeedEntry.objects.filter(user=other, post=posts[2]).delete()
+        FeedEntry.objects.create(user=self.reader, post=posts[0],
+                                 pub_date=posts[0].pub_date)
+        self.assertEqual(
+            feed.overflow([self.reader.pk, other.pk]),
+            [(self.reader.pk, posts[0].pub_date, posts[0].pk)]
+        )
+        feed.trim_followers(self.author.pk)
+        self.assertEqual(
+            sorted(FeedEntry.objects.filter(user=self.reader)
+                   .values_list('post_id', flat=True)),
+            [posts[1].id, posts[2].id]
+        )
+        self.assertEqual(FeedEntry.objects.filter(user=other).count(), 1)
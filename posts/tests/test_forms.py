@@ -1,10 +1,14 @@
+import os
 import shutil
+import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.models import Group, Post
 
@@ -79,3 +83,74 @@ class PostCreateFormTests(TestCase):
             'username': self.user,
             'post_id': post.id
         }))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, image, image_format='JPEG', **options):
+        buffer = BytesIO()
+        image.save(buffer, image_format, **options)
+        return SimpleUploadedFile(
+            name=f'image.{image_format.lower()}',
+            content=buffer.getvalue(),
+            content_type=f'image/{image_format.lower()}'
+        )
+
+    def post_image(self, upload):
+        return self.authorized_client.post(
+            reverse('new_post'), data={'text': 'Текст', 'image': upload}
+        )
+
+    @override_settings(POSTS_MAX_UPLOAD_SIZE=1024)
+    def test_too_large_file_is_rejected(self):
+        noise = Image.frombytes('RGB', (100, 100), os.urandom(30000))
+        response = self.post_image(self.upload(noise, 'PNG'))
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response, 'form', 'image',
+            'Файл слишком большой: не больше 1,0\xa0КБ'
+        )
+
+    @override_settings(POSTS_MAX_IMAGE_PIXELS=100 * 100)
+    def test_too_many_pixels_is_rejected(self):
+        response = self.post_image(self.upload(Image.new('RGB', (200, 200))))
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка содержит слишком много пикселей'
+        )
+
+    def test_not_an_image_is_rejected(self):
+        upload = SimpleUploadedFile(
+            name='image.jpg', content=b'not an image' * 100,
+            content_type='image/jpeg'
+        )
+        response = self.post_image(upload)
+        self.assertFalse(Post.objects.exists())
+        self.assertIn('image', response.context['form'].errors)
+
+    @override_settings(POSTS_MAX_IMAGE_SIDE=50)
+    def test_image_is_reencoded_without_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        exif[0x0112] = 6
+        image = Image.new('RGB', (120, 60))
+        self.post_image(self.upload(image, exif=exif.tobytes()))
+        post = Post.objects.get()
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(dict(stored.getexif()), {})
+            self.assertEqual(stored.size, (25, 50))
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, skipUnlessDBFeature
+
+from posts.feed import feed_queryset, follow_feed, window
+from posts.models import Comment, Follow, Group, Post
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class IndexUsageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовый текст',
+            slug='test-slug',
+            description='Описание'
+        )
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.post = Post.objects.create(
+            text='Пост', group=cls.group, author=cls.user
+        )
+
+    def assertUsesIndex(self, queryset, index):
+        self.assertIn(f'INDEX {index}', queryset.explain())
+
+    def test_feed_queries_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Планы запросов проверяются для SQLite')
+        queries = {
+            'post_date_id_idx': feed_queryset()[:10],
+            'post_group_date_idx': feed_queryset(self.group.posts.all())[:10],
+            'post_author_date_idx': feed_queryset(self.user.posts.all())[:10],
+            'comment_post_created_idx':
+                Comment.objects.filter(post=self.post).order_by('created'),
+            'follow_author_user_idx':
+                Follow.objects.filter(author=self.user).values('user'),
+        }
+        for index, queryset in queries.items():
+            with self.subTest(index=index):
+                self.assertUsesIndex(queryset, index)
+
+    def test_follow_lookups_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Планы запросов проверяются для SQLite')
+        plan = Follow.objects.filter(
+            user=self.reader, author=self.user
+        ).explain()
+        self.assertIn('COVERING INDEX', plan)
+        self.assertIn('user_id=? AND author_id=?', plan)
+
+    def test_follow_feed_reads_one_index_range(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Планы запросов проверяются для SQLite')
+        entries = follow_feed(self.reader).entries()
+        key = (self.post.pub_date, self.post.pk)
+        for page in (window(entries, 'post_id', 10),
+                     window(entries, 'post_id', 10, after=key),
+                     window(entries, 'post_id', 10, before=key)):
+            with self.subTest(query=str(page.query)):
+                plan = page.explain()
+                self.assertIn('INDEX feed_user_date_post_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.user)
@@ -0,0 +1,113 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.instrumentation import RequestInstrumentationMiddleware, shape
+from posts.models import Post
+
+
+@override_settings(POSTS_SERVER_TIMING=True)
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def timing(self, response):
+        return dict(
+            (part.split(';')[0], part) for part in
+            response['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('index'))
+        timing = self.timing(response)
+        self.assertLessEqual({'db', 'dup', 'tpl', 'cache', 'total'},
+                             set(timing))
+        self.assertRegex(timing['db'], r'desc="[1-9]\d* queries"')
+        self.assertNotIn('dur=0.0', timing['tpl'])
+        self.assertRegex(timing['cache'], r'miss=[1-9]')
+        # Повторный анонимный запрос отдаётся из кэша страниц
+        timing = self.timing(self.client.get(reverse('index')))
+        self.assertIn('desc="0 queries"', timing['db'])
+        self.assertEqual(timing['tpl'], 'tpl;dur=0.0')
+        self.assertRegex(timing['cache'], r'hit=[1-9]')
+
+    def test_structured_log(self):
+        with self.assertLogs('posts.requests', 'INFO') as logs:
+            self.client.get(reverse('profile', args=('user',)))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'profile')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+
+    @override_settings(POSTS_SLOW_REQUEST_MS=0, POSTS_DUPLICATE_QUERIES=2)
+    def test_slow_log_shows_repeated_queries(self):
+        def n_plus_one(request):
+            for post_id in range(3):
+                Post.objects.filter(id=post_id).exists()
+            return HttpResponse()
+
+        middleware = RequestInstrumentationMiddleware(n_plus_one)
+        with self.assertLogs('posts.requests.slow', 'WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record['slowest'])
+        self.assertIn('sql', record['slowest'][0])
+        self.assertTrue(record['repeated'])
+
+    @override_settings(POSTS_TEMPLATE_PROFILE=True)
+    def test_template_profile_counts_includes(self):
+        for i in range(2):
+            Post.objects.create(text=f'Ещё {i}', author=self.user)
+        with self.assertLogs('posts.requests', 'INFO') as logs:
+            response = self.client.get(reverse('index'))
+        record = json.loads(logs.records[0].getMessage())
+        templates = {row['name']: row for row in record['templates']}
+        self.assertEqual(templates['includes/post_card.html']['count'], 3)
+        self.assertEqual(templates['index.html']['count'], 1)
+        # Время страницы включает её include, собственное — нет
+        page = templates['index.html']
+        self.assertGreater(page['ms'], page['self_ms'])
+        self.assertIn('includes/post_card.html x3',
+                      response['Server-Timing'])
+
+    @override_settings(POSTS_TEMPLATE_PROFILE=False)
+    def test_template_profile_disabled(self):
+        with self.assertLogs('posts.requests', 'INFO') as logs:
+            response = self.client.get(reverse('index'))
+        self.assertNotIn('templates', json.loads(logs.records[0].getMessage()))
+        self.assertNotIn('tpl-1', response['Server-Timing'])
+
+    def test_profile_templates_command(self):
+        out = StringIO()
+        call_command('profile_templates', reverse('index'), '--repeat', '2',
+                     stdout=out)
+        self.assertIn('includes/post_card.html', out.getvalue())
+
+    @override_settings(POSTS_INSTRUMENTATION=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(POSTS_SERVER_TIMING=False)
+    def test_server_timing_is_opt_in(self):
+        with self.assertLogs('posts.requests', 'INFO'):
+            response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_shape_collapses_values(self):
+        self.assertEqual(
+            shape('SELECT * FROM t WHERE id IN (%s, %s,  %s) LIMIT 10'),
+            shape('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 20'),
+        )
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from posts.pagecache import stats
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_anonymous_pages_cached(self):
+        url = reverse('post', args=(self.user.username, self.post.id))
+        first = self.client.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second['X-Page-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(stats(), {'hit': 1, 'miss': 1})
+
+    def test_page_params_in_key(self):
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'), {'page': 2})
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        response = self.client.get(reverse('index'), {'utm': 'x'})
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+    def test_authenticated_bypass(self):
+        self.client.get(reverse('index'))
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'reader')
+
+    def test_writes_invalidate(self):
+        url = reverse('profile', args=(self.user.username,))
+        writes = [
+            lambda: Post.objects.create(text='Новый', author=self.user),
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Да'
+            ),
+            lambda: Follow.objects.create(user=self.reader, author=self.user),
+        ]
+        for write in writes:
+            self.client.get(url)
+            write()
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'MISS')
+
+    def test_cached_page_answers_conditional_get(self):
+        url = reverse('index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+    def test_miss_with_if_none_match_caches_full_page(self):
+        url = reverse('index')
+        etag = self.client.get(url)['ETag']
+        cache.clear()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Пост')
+
+    @override_settings(POSTS_PAGE_CACHE=False)
+    def test_disabled(self):
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_stats_command(self):
+        self.client.get(reverse('index'))
+        out = StringIO()
+        call_command('page_cache_stats', '--reset', stdout=out)
+        self.assertIn('miss: 1', out.getvalue())
+        self.assertEqual(stats(), {'hit': 0, 'miss': 0})
@@ -0,0 +1,160 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.paginator import CursorPage, CursorPaginator, page_window
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовый текст',
+            slug='test-slug',
+            description='Описание'
+        )
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for i in range(25):
+            Post.objects.create(
+                text=f'Пост {i}',
+                group=cls.group,
+                author=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def collect_forward(self, paginator):
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def test_forward_pages_cover_feed_once(self):
+        queryset = Post.objects.all()
+        pages = self.collect_forward(CursorPaginator(queryset, 10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        ids = [post.id for page in pages for post in page]
+        self.assertEqual(
+            ids, list(queryset.order_by('-pub_date', '-id')
+                      .values_list('id', flat=True))
+        )
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_previous_cursor_returns_same_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        pages = self.collect_forward(paginator)
+        back = paginator.get_page(pages[2].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_deep_page_runs_single_query(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        cursor = self.collect_forward(paginator)[1].next_cursor
+        with self.assertNumQueries(1):
+            paginator.get_page(cursor)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page('not-a-cursor')
+        self.assertEqual(list(page), list(paginator.get_page(None)))
+
+    def test_feed_views_accept_cursor(self):
+        urls = {
+            reverse('index'): self.client,
+            reverse('group', kwargs={'slug': self.group.slug}): self.client,
+            reverse('profile', kwargs={'username': self.user}): self.client,
+            reverse('follow_index'): self.reader_client,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                response = client.get(url + '?cursor=')
+                page = response.context.get('page')
+                self.assertIsInstance(page, CursorPage)
+                self.assertEqual(len(page), 10)
+                self.assertContains(response, page.next_cursor)
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_cursor_mode_from_settings(self):
+        response = self.client.get(reverse('index'))
+        self.assertIsInstance(response.context.get('page'), CursorPage)
+
+
+class PageWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(200)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_window(self):
+        cases = {
+            (1, 5000): [1, 2, 3, None, 5000],
+            (49, 5000): [1, None, 47, 48, 49, 50, 51, None, 5000],
+            (5000, 5000): [1, None, 4998, 4999, 5000],
+            (5, 5000): [1, 2, 3, 4, 5, 6, 7, None, 5000],
+            (3, 7): [1, 2, 3, 4, 5, 6, 7],
+            (1, 1): [1],
+        }
+        for (number, num_pages), window in cases.items():
+            with self.subTest(number=number, num_pages=num_pages):
+                self.assertEqual(page_window(number, num_pages), window)
+
+    def test_feed_renders_window_only(self):
+        response = self.client.get(reverse('index') + '?page=10')
+        self.assertEqual(response.context['page'].window,
+                         [1, None, 8, 9, 10, 11, 12, None, 20])
+        for number in (1, 8, 12, 20):
+            self.assertContains(response, f'page={number}"')
+        self.assertNotContains(response, 'page=5"')
+        self.assertContains(response, '&hellip;', count=2)
+
+    def fetch(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        counts = [query['sql'] for query in context.captured_queries
+                  if 'COUNT(' in query['sql']]
+        return response, counts
+
+    @override_settings(POSTS_PAGINATION_COUNT='approximate')
+    def test_approximate_count_is_cached(self):
+        response, counts = self.fetch(reverse('index'))
+        self.assertEqual(len(counts), 1)
+        self.assertEqual(response.context['paginator'].count, 200)
+        Post.objects.create(text='Новый', author=self.user)
+        response, counts = self.fetch(reverse('index'))
+        self.assertEqual(counts, [])
+        self.assertEqual(response.context['paginator'].count, 200)
+
+    @override_settings(POSTS_PAGINATION_COUNT='approximate')
+    def test_profile_uses_post_counter(self):
+        author = get_user_model().objects.create_user(username='author')
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=author)
+        response, counts = self.fetch(reverse('profile', args=('author',)))
+        self.assertEqual(counts, [])
+        self.assertEqual(response.context['paginator'].count, 3)
+        self.assertEqual(len(response.context['page']), 3)
+
+    def test_exact_count_by_default(self):
+        _, counts = self.fetch(reverse('index'))
+        self.assertEqual(len(counts), 1)
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.querybudget import (
+    BUDGETS, QueryBudget, QueryBudgetExceeded, assert_constant_queries,
+)
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовый текст',
+            slug='test-slug',
+            description='Описание'
+        )
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = [
+            reverse('index'),
+            reverse('group', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.user}),
+            reverse('follow_index'),
+        ]
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Пост {i}', group=self.group, author=self.user
+            )
+            Comment.objects.create(post=post, author=self.reader, text='К')
+
+    def grow(self, size):
+        """Доводит число постов и комментариев первого поста до size."""
+        self.add_posts(size - Post.objects.count())
+        first = Post.objects.order_by('id').first()
+        for i in range(size - first.comments.count()):
+            Comment.objects.create(
+                post=first, text='К',
+                author=get_user_model().objects.create_user(
+                    f'commenter{size}-{i}'
+                ),
+            )
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                assert_constant_queries(
+                    lambda: self.reader_client.get(url), self.grow
+                )
+
+    def test_post_page_does_not_query_per_comment(self):
+        self.add_posts(1)
+        post = Post.objects.get()
+        assert_constant_queries(
+            lambda: self.reader_client.get(
+                reverse('post', args=(self.user.username, post.id))
+            ),
+            self.grow,
+        )
+
+    def test_views_fit_query_budgets(self):
+        self.grow(15)
+        post = Post.objects.order_by('id').first()
+        urls = {
+            'index': reverse('index'),
+            'group': reverse('group', args=(self.group.slug,)),
+            'profile': reverse('profile', args=(self.user.username,)),
+            'post': reverse('post', args=(self.user.username, post.id)),
+            'follow_index': reverse('follow_index'),
+            'search': reverse('search') + '?q=пост',
+            'api:posts': reverse('api:posts'),
+            'api:post': reverse('api:post', args=(post.id,)),
+            'api:comments': reverse('api:comments', args=(post.id,)),
+        }
+        for name, url in urls.items():
+            with self.subTest(name=name):
+                with QueryBudget(name):
+                    self.reader_client.get(url)
+
+    def test_budget_failure_lists_queries(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with QueryBudget(1):
+                list(Post.objects.all())
+                list(Group.objects.all())
+        message = str(raised.exception)
+        self.assertIn('2 запросов при бюджете 1', message)
+        self.assertIn('posts_group', message)
+        self.assertIn('index', BUDGETS)
+
+    def test_post_card_shows_comment_count(self):
+        self.add_posts(1)
+        response = self.reader_client.get(reverse('index'))
+        self.assertEqual(response.context.get('page')[0].comment_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
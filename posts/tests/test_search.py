@@ -0,0 +1,106 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, SearchTerm
+from posts.search import (PythonBackend, SearchResults, get_backend,
+                          highlight)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Котики', slug='cats', description='Всё о котиках'
+        )
+        cls.cats = Post.objects.create(
+            text='Котики спят. Котики едят. Собаки лают.', author=cls.user
+        )
+        cls.dogs = Post.objects.create(text='Собаки гуляют', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def ids(self, query):
+        return [post.id for post in SearchResults(query)[:10]]
+
+    def check_ranking(self):
+        self.assertEqual(self.ids('котики'), [self.cats.id])
+        self.assertEqual(self.ids('котики гуляют'), [])
+        self.assertEqual(SearchResults('собаки').count(), 2)
+        once = Post.objects.create(
+            text='Котики, собаки, кошки и попугаи живут дружно',
+            author=self.user
+        )
+        self.assertEqual(self.ids('котики'), [self.cats.id, once.id])
+
+    def test_ranking_and_and_semantics(self):
+        self.check_ranking()
+
+    def test_index_follows_edit_and_delete(self):
+        post = Post.objects.get(id=self.dogs.id)
+        post.text = 'Котики гуляют'
+        post.save()
+        self.assertEqual(self.ids('гуляют котики'), [post.id])
+        post.delete()
+        self.assertEqual(self.ids('гуляют'), [])
+
+    def test_word_forms_match(self):
+        self.assertEqual(self.ids('КОТИКОВ'), [self.cats.id])
+        self.assertEqual(self.ids('собака'), [self.dogs.id, self.cats.id])
+
+    def test_stop_words_only_query(self):
+        self.assertEqual(SearchResults('и в на').count(), 0)
+
+    def test_group_search(self):
+        groups = SearchResults('котиках', kind='group')[:5]
+        self.assertEqual(groups, [self.group])
+
+    def test_highlight_escapes_and_marks(self):
+        snippet = highlight('<b>Котики</b> спят', ['котик'])
+        self.assertEqual(
+            snippet, '&lt;b&gt;<mark>Котики</mark>&lt;/b&gt; спят'
+        )
+
+    def test_search_view(self):
+        response = self.client.get(reverse('search'), {'q': 'котики'})
+        self.assertEqual(len(response.context['page']), 1)
+        self.assertContains(response, '<mark>Котики</mark>')
+        self.assertEqual(response.context['groups'], [self.group])
+
+    def test_admin_uses_index(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'гуляют'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dogs]
+        )
+
+    @override_settings(POSTS_SEARCH_BACKEND='python')
+    def test_python_backend(self):
+        self.assertEqual(get_backend().name, 'python')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertTrue(SearchTerm.objects.exists())
+        self.check_ranking()
+
+    @override_settings(POSTS_SEARCH_BACKEND='python')
+    def test_python_backend_ranks_once_per_page(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        rank = PythonBackend.rank
+        with mock.patch.object(PythonBackend, 'rank', autospec=True,
+                               side_effect=rank) as ranked:
+            page = Paginator(SearchResults('собаки'), 1).page(2)
+            self.assertEqual(len(page.object_list), 1)
+            self.assertEqual(page.paginator.count, 2)
+        self.assertEqual(ranked.call_count, 1)
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from posts import sqlite
+
+PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 50,
+    'temp_store': 'memory',
+}
+
+
+@override_settings(POSTS_SQLITE_PRAGMAS=PRAGMAS,
+                   POSTS_SQLITE_BEGIN='IMMEDIATE')
+class FileDatabaseTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'db.sqlite3')
+
+    def connect(self):
+        wrapper = DatabaseWrapper(dict(connection.settings_dict,
+                                       NAME=self.path))
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_new_connection_is_configured(self):
+        values = sqlite.current(self.connect())
+        self.assertEqual(values['journal_mode'], 'wal')
+        self.assertEqual(values['busy_timeout'], 50)
+        self.assertEqual(values['synchronous'], 1)
+        self.assertEqual(values['temp_store'], 2)
+
+    def test_transactions_take_write_lock_at_begin(self):
+        first, second = self.connect(), self.connect()
+        first.ensure_connection()
+        first._start_transaction_under_autocommit()
+        self.addCleanup(first.connection.rollback)
+        second.ensure_connection()
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            second._start_transaction_under_autocommit()
+
+    def test_tuning_can_be_disabled(self):
+        with self.settings(POSTS_SQLITE_PRAGMAS={}, POSTS_SQLITE_BEGIN=None):
+            values = sqlite.current(self.connect())
+        self.assertEqual(values['journal_mode'], 'delete')
+        self.assertEqual(values['synchronous'], 2)
+
+
+class TestDatabaseTests(TestCase):
+    def test_memory_database_keeps_journal_mode(self):
+        values = sqlite.current(connection)
+        self.assertEqual(values['journal_mode'], 'memory')
+        self.assertEqual(values['temp_store'], 2)
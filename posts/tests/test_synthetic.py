@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TransactionTestCase, override_settings
+
+from posts.loadtest import (
+    SCENARIOS, ClientDriver, WsgiDriver, plan, report, run,
+)
+from posts.models import Comment, FeedEntry, Follow, Post
+from posts.synthetic import generate
+from users.models import Profile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SyntheticDataTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.created = generate(users=40, groups=3, posts=200, comments=300,
+                                follows=5, images=2, seed=1)
+
+    def test_dataset(self):
+        self.assertEqual(self.created['posts'], Post.objects.count())
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertGreater((max(dates) - min(dates)).days, 30)
+        # Степенной граф: у самого популярного автора подписчиков много
+        followers = sorted(
+            Follow.objects.values('author').annotate(n=Count('id'))
+            .values_list('n', flat=True), reverse=True
+        )
+        self.assertGreater(followers[0], 4 * followers[len(followers) // 2])
+        top = Profile.objects.order_by('-follower_count').first()
+        self.assertEqual(top.follower_count, followers[0])
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_loadtest_client_driver(self):
+        steps, user = plan()
+        # Общая память тестовой SQLite не ждёт блокировок, поэтому
+        # в тестах один поток
+        samples, elapsed = run(ClientDriver(user), steps, requests=10,
+                               concurrency=1)
+        rows = report(samples, elapsed)
+        self.assertEqual(set(rows), set(SCENARIOS) | {'total'})
+        self.assertEqual(rows['total']['errors'], 0)
+        self.assertGreater(rows['follow_index']['queries'], 0)
+        self.assertEqual(Comment.objects.count(), 302)
+
+    def test_loadtest_wsgi_driver(self):
+        steps, user = plan()
+        samples, elapsed = run(WsgiDriver(user), steps, requests=5,
+                               concurrency=1)
+        self.assertEqual([sample.status for sample in samples],
+                         [200, 200, 200, 200, 302])
+        self.assertEqual(Comment.objects.count(), 301)
+
+    def test_commands(self):
+        out = StringIO()
+        call_command('loadtest', '--requests=5', '--concurrency=1',
+                     '--scenarios=index,post', stdout=out)
+        self.assertIn('запросов/с', out.getvalue())
+        out = StringIO()
+        call_command('generate_data', '--users=5', '--posts=5',
+                     '--comments=5', '--images=0', '--seed=2', stdout=out)
+        self.assertIn('posts: 5', out.getvalue())
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from posts.templating import engine, is_cached, template_names, warm_up
+
+CACHED = [dict(
+    settings.TEMPLATES[0],
+    OPTIONS=dict(
+        settings.TEMPLATES[0]['OPTIONS'],
+        loaders=[('django.template.loaders.cached.Loader',
+                  settings.TEMPLATE_LOADERS)],
+    ),
+)]
+UNCACHED = [dict(
+    settings.TEMPLATES[0],
+    OPTIONS=dict(settings.TEMPLATES[0]['OPTIONS'],
+                 loaders=settings.TEMPLATE_LOADERS),
+)]
+
+
+class TemplatingTests(SimpleTestCase):
+    def test_template_names(self):
+        names = template_names()
+        for name in ('index.html', 'includes/post_card.html',
+                     'admin/base.html'):
+            self.assertIn(name, names)
+        self.assertEqual(len(names), len(set(names)))
+
+    @override_settings(TEMPLATES=CACHED)
+    def test_warm_up_compiles_every_template(self):
+        self.assertTrue(is_cached())
+        compiled = warm_up()
+        self.assertGreater(compiled, 0)
+        loader = engine().template_loaders[0]
+        cached = {key.split('-')[0] for key in loader.get_template_cache}
+        self.assertIn('includes/post_card.html', cached)
+        self.assertIn('includes/comments.html', cached)
+
+    @override_settings(TEMPLATES=UNCACHED)
+    def test_warm_up_needs_cached_loader(self):
+        self.assertFalse(is_cached())
+        self.assertEqual(warm_up(), 0)
@@ -0,0 +1,159 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import threads
+from posts.models import Comment, Post
+from posts.querybudget import QueryBudget
+
+
+class ThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def comment(self, text, parent=None, post=None):
+        return Comment.objects.create(post=post or self.post, text=text,
+                                      author=self.user, parent=parent)
+
+    def test_paths(self):
+        root = self.comment('Корень')
+        reply = self.comment('Ответ', parent=root)
+        deeper = self.comment('Ещё', parent=reply)
+        self.assertEqual(root.path, threads.segment(root.pk))
+        self.assertEqual(
+            Comment.objects.get(pk=deeper.pk).path,
+            '.'.join(threads.segment(c.pk) for c in (root, reply, deeper))
+        )
+
+    def test_page_orders_threads(self):
+        first = self.comment('Первый')
+        second = self.comment('Второй')
+        reply = self.comment('Ответ первому', parent=first)
+        nested = self.comment('Ответ на ответ', parent=reply)
+        late = self.comment('Поздний ответ первому', parent=first)
+        page = threads.comment_page(self.post, per_page=10)
+        self.assertEqual(
+            [(c.text, c.indent) for c in page.comments],
+            [('Второй', 0), ('Первый', 0), ('Ответ первому', 1),
+             ('Ответ на ответ', 2), ('Поздний ответ первому', 1)]
+        )
+        self.assertFalse(page.has_next())
+        self.assertEqual([c.pk for c in threads.descendants(first)],
+                         [reply.pk, nested.pk, late.pk])
+        self.assertEqual(list(threads.descendants(second)), [])
+
+    def test_pages_by_root(self):
+        roots = [self.comment(f'Корень {i}') for i in range(5)]
+        self.comment('Ответ', parent=roots[2])
+        other = Post.objects.create(text='Другой', author=self.user)
+        self.comment('Чужой', post=other)
+        page = threads.comment_page(self.post, per_page=2)
+        self.assertEqual([c.pk for c in page.comments],
+                         [roots[4].pk, roots[3].pk])
+        self.assertEqual(page.next_cursor, roots[3].pk)
+        page = threads.comment_page(self.post, page.next_cursor, 2)
+        self.assertEqual([c.text for c in page.comments],
+                         ['Корень 2', 'Ответ', 'Корень 1'])
+        page = threads.comment_page(self.post, 'мусор', 10)
+        self.assertEqual(len(page.comments), 6)
+
+    def test_page_queries_do_not_grow_with_replies(self):
+        root = self.comment('Корень')
+        parent = root
+        for i in range(30):
+            parent = self.comment(f'Ответ {i}', parent=parent)
+        with QueryBudget(2):
+            comments = list(threads.comment_page(self.post).comments)
+            [comment.author.username for comment in comments]
+        self.assertEqual(len(comments), 31)
+        self.assertEqual(comments[-1].indent, threads.MAX_INDENT)
+
+    def test_reply_parent(self):
+        root = self.comment('Корень')
+        other = Post.objects.create(text='Другой', author=self.user)
+        self.assertEqual(threads.reply_parent(self.post, root.pk), root)
+        self.assertIsNone(threads.reply_parent(other, root.pk))
+        self.assertIsNone(threads.reply_parent(self.post, 'x'))
+        parent = root
+        for _ in range(threads.MAX_DEPTH):
+            parent = self.comment('Глубже', parent=parent)
+        self.assertEqual(threads.depth(parent.path), threads.MAX_DEPTH)
+        target = threads.reply_parent(self.post, parent.pk)
+        self.assertEqual(threads.depth(target.path), threads.MAX_DEPTH - 1)
+
+    def test_fill_paths_after_bulk_create(self):
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text='Корень'),
+        ])
+        root = Comment.objects.get(text='Корень')
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text='Ответ',
+                    parent=root),
+        ])
+        threads.fill_paths()
+        root.refresh_from_db()
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(root.path, threads.segment(root.pk))
+        self.assertEqual(reply.path,
+                         root.path + '.' + threads.segment(reply.pk))
+
+    def test_post_page_with_bulk_created_roots(self):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Массовый {i}')
+            for i in range(threads.COMMENTS_PER_PAGE + 5)
+        )
+        response = self.client.get(
+            reverse('post', args=('user', self.post.id)))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Массовый 24')
+        page = response.context['comments_page']
+        response = self.client.get(
+            reverse('post_comments', args=('user', self.post.id)),
+            {'cursor': page.next_cursor},
+        )
+        self.assertContains(response, 'Массовый 0')
+        self.assertFalse(Comment.objects.filter(path='').exists())
+
+    def test_post_page_and_fragment(self):
+        for i in range(threads.COMMENTS_PER_PAGE + 3):
+            self.comment(f'Комментарий {i}')
+        url = reverse('post', args=('user', self.post.id))
+        response = self.client.get(url)
+        page = response.context['comments_page']
+        self.assertContains(response, 'Комментарий 22')
+        self.assertNotContains(response, 'Комментарий 2<')
+        fragment = reverse('post_comments', args=('user', self.post.id))
+        self.assertContains(response, f'{fragment}?cursor={page.next_cursor}')
+        response = self.client.get(
+            fragment, {'cursor': page.next_cursor, 'format': 'json'}
+        )
+        data = json.loads(response.content)
+        self.assertIn('Комментарий 0', data['html'])
+        self.assertNotIn('Комментарий 3<', data['html'])
+        self.assertIsNone(data['next'])
+        response = self.client.get(fragment, {'cursor': page.next_cursor})
+        self.assertContains(response, 'Комментарий 2')
+        self.assertNotContains(response, '<html')
+
+    def test_reply_through_form(self):
+        root = self.comment('Корень')
+        url = reverse('post', args=('user', self.post.id))
+        response = self.client.get(url, {'reply': root.pk})
+        self.assertContains(response, f'name="parent" value="{root.pk}"')
+        self.client.post(
+            reverse('add_comment', args=('user', self.post.id)),
+            {'text': 'Ответ', 'parent': root.pk},
+        )
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(reply.parent, root)
+        self.assertTrue(reply.path.startswith(root.path + '.'))
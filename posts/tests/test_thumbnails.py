@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.thumbnails import supported_formats
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POSTS_THUMBNAILS_SYNC=True)
+class ThumbnailTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='user')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def upload(self):
+        return SimpleUploadedFile(
+            name='small.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+
+    def test_new_post_stores_thumbnail_urls(self):
+        self.client.post(
+            reverse('new_post'),
+            data={'text': 'Пост', 'image': self.upload()}
+        )
+        post = Post.objects.get(text='Пост')
+        self.assertIn('card', post.thumbnail_urls)
+        self.assertIn('small', post.thumbnail_urls)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, post.thumbnail_urls['card'])
+
+    def test_responsive_derivatives(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 800), 'red').save(buffer, 'PNG')
+        upload = SimpleUploadedFile(
+            name='big.png', content=buffer.getvalue(),
+            content_type='image/png'
+        )
+        self.client.post(
+            reverse('new_post'), data={'text': 'Пост', 'image': upload}
+        )
+        images = Post.objects.get(text='Пост').thumbnail_urls
+        self.assertEqual(images['srcset'].count('w,'), 1)
+        self.assertIn('320w', images['srcset'])
+        self.assertIn('640w', images['srcset'])
+        self.assertNotIn('1200w', images['srcset'])
+        self.assertEqual((images['width'], images['height']), (640, 480))
+        modern = [mime for mime in supported_formats()
+                  if mime != 'image/jpeg']
+        self.assertEqual([mime for mime, _ in images['sources']], modern)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, images['srcset'])
+        for mime in modern:
+            self.assertContains(response, f'type="{mime}"')
+
+    def test_edit_with_new_image_rebuilds_thumbnails(self):
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=self.upload()
+        )
+        self.assertEqual(post.thumbnails, '')
+        self.client.post(
+            reverse('post_edit', args=(self.user, post.id)),
+            data={'text': 'Пост', 'image': self.upload()}
+        )
+        post.refresh_from_db()
+        self.assertIn('card', post.thumbnail_urls)
+
+    def test_warm_thumbnails_command(self):
+        posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=self.user, image=self.upload()
+            )
+            for i in range(3)
+        ]
+        call_command('warm_thumbnails', workers=2, stdout=StringIO())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertIn('card', post.thumbnail_urls)
@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from posts.tokenizer import normalize, stem_en, stem_ru, tokenize
+
+
+class TokenizerTests(SimpleTestCase):
+    def test_russian_word_forms_share_term(self):
+        forms = ['котик', 'Котики', 'котиков', 'КОТИКАМИ', 'котиках']
+        self.assertEqual({normalize(word) for word in forms}, {'котик'})
+
+    def test_yo_folding(self):
+        self.assertEqual(normalize('Ёжик'), normalize('ежик'))
+        self.assertIsNone(normalize('её'))
+
+    def test_stop_words_dropped(self):
+        self.assertEqual(tokenize('Кот и пёс, the cat'),
+                         ['кот', 'пес', 'cat'])
+
+    def test_russian_stemmer(self):
+        cases = {
+            'возможность': 'возможн',
+            'красивейший': 'красив',
+            'прочитавшись': 'прочита',
+            'бегущими': 'бегущ',
+            'лошадей': 'лошад',
+        }
+        for word, stem in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem_ru(word), stem)
+
+    def test_english_stemmer(self):
+        cases = {
+            'cats': 'cat', 'flies': 'fly', 'classes': 'class',
+            'running': 'run', 'jumped': 'jump', 'quickly': 'quick',
+            'bus': 'bus', 'is': 'is',
+        }
+        for word, stem in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem_en(word), stem)
+
+    def test_mixed_tokens_kept(self):
+        self.assertEqual(tokenize('Python3 и 2020'), ['python3', '2020'])
@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from posts.models import Comment, FeedEntry, Follow, Group, Post
+from posts.search import SearchResults
+from users.models import Profile
+
+
+class TransferTests(TransactionTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        User = get_user_model()
+        self.author = User.objects.create_user(
+            username='author', password='secret', first_name='Имя'
+        )
+        self.reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Группа', slug='group')
+        self.posts = [
+            Post.objects.create(
+                text=f'Котики {i}', author=self.author, group=group,
+                image='posts/cat.jpg' if i == 0 else None
+            )
+            for i in range(5)
+        ]
+        self.comment = Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Да'
+        )
+        # Даты из прошлого: импорт не должен заменить их своим временем
+        published = datetime(2025, 9, 13, 12, 0, tzinfo=timezone.utc)
+        for i, post in enumerate(self.posts):
+            post.pub_date = published + timedelta(hours=i)
+            Post.objects.filter(pk=post.pk).update(pub_date=post.pub_date)
+        self.comment.created = published
+        Comment.objects.filter(pk=self.comment.pk).update(created=published)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def export(self):
+        call_command('export_content', self.directory, '--chunk-size=2',
+                     stdout=StringIO())
+
+    def wipe(self):
+        for model in (Follow, Comment, Post, Group, get_user_model()):
+            model.objects.all().delete()
+
+    def test_round_trip(self):
+        self.export()
+        with open(os.path.join(self.directory, 'posts.jsonl')) as file:
+            self.assertEqual(len(file.readlines()), 5)
+        self.wipe()
+        out = StringIO()
+        call_command('import_content', self.directory, '--chunk-size=2',
+                     '--workers=2', stdout=out)
+        self.assertIn('posts: 5', out.getvalue())
+        author = get_user_model().objects.get(username='author')
+        self.assertEqual(author.pk, self.author.pk)
+        self.assertTrue(author.check_password('secret'))
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(post.image.name, 'posts/cat.jpg')
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(
+            dict(Post.objects.values_list('pk', 'pub_date')),
+            {post.pk: post.pub_date for post in self.posts}
+        )
+        self.assertEqual(Comment.objects.get().created, self.comment.created)
+        self.assertEqual(Profile.objects.get(user=author).post_count, 5)
+        self.assertEqual(
+            FeedEntry.objects.filter(user_id=self.reader.pk).count(), 5
+        )
+        self.assertEqual(SearchResults('котики').count(), 5)
+        # Новые строки получают ключи после загруженных
+        self.assertGreater(
+            Post.objects.create(text='Новый', author=author).pk,
+            self.posts[-1].pk
+        )
+
+    def test_resume_skips_loaded_rows(self):
+        self.export()
+        self.wipe()
+        call_command('import_content', self.directory, '--workers=1',
+                     '--no-rebuild', stdout=StringIO())
+        # Импорт прервался после трёх постов
+        Post.objects.filter(
+            pk__in=[post.pk for post in self.posts[3:]]
+        ).delete()
+        with open(os.path.join(self.directory, 'import-state.json'),
+                  'w') as file:
+            json.dump({'users': 2, 'groups': 1, 'posts': 3}, file)
+        out = StringIO()
+        call_command('import_content', self.directory, '--workers=1',
+                     '--no-rebuild', stdout=out)
+        self.assertIn('users: 0', out.getvalue())
+        self.assertIn('posts: 2', out.getvalue())
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
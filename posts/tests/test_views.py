@@ -3,6 +3,7 @@ import shutil
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase
 from django.urls import reverse
@@ -73,6 +74,7 @@ class ViewFunTests(TestCase):
         super().tearDownClass()
 
     def setUp(self):
+        cache.clear()
         self.authorized_follower = Client()
         self.authorized_follower.force_login(self.follower)
         self.authorized_another_follower = Client()
@@ -216,10 +218,16 @@ class ViewFunTests(TestCase):
     def test_cache(self):
         response = self.authorized_client.get(reverse('index'))
         cached_response_content = response.content
+        Post.objects.filter(id=11).update(text='Изменённый текст')
+        response = self.authorized_client.get(reverse('index'))
+        self.assertEqual(cached_response_content, response.content)
         instance = Post.objects.get(id=11)
+        instance.save()
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'Изменённый текст')
         instance.delete()
         response = self.authorized_client.get(reverse('index'))
-        self.assertEqual(cached_response_content, response.content)
+        self.assertNotContains(response, 'Изменённый текст')
 
     def test_follow_unfollow(self):
         self.authorized_client.get(reverse(
@@ -253,3 +261,55 @@ class ViewFunTests(TestCase):
             data=form_data, follow=True
         )
         self.assertEqual(Comment.objects.count(), 1)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='user')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_viewer_dependent_links_are_not_cached(self):
+        edit_url = reverse('post_edit', args=(self.user, self.post.id))
+        response = self.author_client.get(reverse('index'))
+        self.assertContains(response, edit_url)
+        response = self.reader_client.get(reverse('index'))
+        self.assertNotContains(response, edit_url)
+
+    def test_pages_are_not_shared(self):
+        for i in range(10):
+            Post.objects.create(text=f'Пост {i}', author=self.user)
+        first = self.reader_client.get(reverse('index'))
+        second = self.reader_client.get(reverse('index') + '?page=2')
+        self.assertNotContains(first, 'Тестовый текст')
+        self.assertContains(second, 'Тестовый текст')
+
+    def test_comment_and_group_change_bump_version(self):
+        version = self.post.version
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, version + 1)
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.filter(id=self.post.id).update(group=group)
+        group.title = 'Новая группа'
+        group.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, version + 2)
+
+    def test_group_delete_drops_cached_cards(self):
+        group = Group.objects.create(title='Удаляемая группа', slug='gone')
+        Post.objects.filter(id=self.post.id).update(group=group)
+        self.assertContains(self.reader_client.get(reverse('index')),
+                            'Удаляемая группа')
+        group.delete()
+        self.assertNotContains(self.reader_client.get(reverse('index')),
+                               'Удаляемая группа')
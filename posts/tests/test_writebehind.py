@@ -0,0 +1,195 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts import threads, writebehind
+from posts.models import Comment, FeedEntry, Follow, Post
+from users.models import Profile
+
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user(username='author')
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.queue = writebehind.WriteQueue()
+        patcher = mock.patch.object(self.queue, 'start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def test_follow_and_unfollow_coalesce(self):
+        pair = (self.reader.pk, self.author.pk)
+        self.queue.put(self.reader.pk, follow=(pair, True))
+        self.queue.put(self.reader.pk, follow=(pair, False))
+        self.queue.put(self.reader.pk, follow=(pair, True))
+        self.assertEqual(len(self.queue.pending), 1)
+        self.assertTrue(cache.get(writebehind.marker(self.reader.pk)))
+        self.assertEqual(self.queue.flush(), 1)
+        self.assertIsNone(cache.get(writebehind.marker(self.reader.pk)))
+        self.assertTrue(Follow.objects.filter(user=self.reader,
+                                              author=self.author).exists())
+        self.assertEqual(self.profile(self.author).follower_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader,
+                                                 post=self.post).exists())
+
+        self.queue.put(self.reader.pk, follow=(pair, True))
+        self.queue.put(self.author.pk, follow=((self.author.pk,) * 2, True))
+        self.queue.flush()
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.profile(self.author).follower_count, 1)
+
+        self.queue.put(self.reader.pk, follow=(pair, False))
+        self.queue.flush()
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.profile(self.author).follower_count, 0)
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    def test_concurrent_insert_does_not_double_count(self):
+        pair = (self.reader.pk, self.author.pk)
+        bulk_create = Follow.objects.bulk_create
+
+        def raced(objects, **kwargs):
+            # Другой процесс успел подписать читателя раньше пакета
+            Follow.objects.create(user=self.reader, author=self.author)
+            return bulk_create(objects, **kwargs)
+
+        self.queue.put(self.reader.pk, follow=(pair, True))
+        with mock.patch.object(Follow.objects, 'bulk_create', raced):
+            self.queue.flush()
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.profile(self.author).follower_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+
+    def test_flushes_apply_in_order(self):
+        pair = (self.reader.pk, self.author.pk)
+        marker = writebehind.marker(self.reader.pk)
+        started, release = threading.Event(), threading.Event()
+        applied = []
+
+        def slow_apply(batch):
+            applied.append(dict(batch.follows))
+            if len(applied) == 1:
+                started.set()
+                release.wait(5)
+
+        with mock.patch.object(writebehind, 'apply_safely', slow_apply):
+            self.queue.put(self.reader.pk, follow=(pair, True))
+            first = threading.Thread(target=self.queue.flush)
+            first.start()
+            started.wait(5)
+            self.queue.put(self.reader.pk, follow=(pair, False))
+            second = threading.Thread(target=self.queue.flush)
+            second.start()
+            second.join(0.1)
+            # Второй сброс ждёт первый, метка держится до конца обоих
+            self.assertTrue(second.is_alive())
+            self.assertEqual(len(applied), 1)
+            self.assertTrue(cache.get(marker))
+            release.set()
+            first.join(5)
+            second.join(5)
+        self.assertEqual(applied, [{pair: True}, {pair: False}])
+        self.assertIsNone(cache.get(marker))
+
+    def test_comments_in_one_batch(self):
+        root = Comment.objects.create(post=self.post, author=self.reader,
+                                      text='Корень')
+        other = Post.objects.create(text='Другой', author=self.author)
+        for text, post, parent in (('Ответ', self.post, root),
+                                   ('Ещё', self.post, None),
+                                   ('Чужой', other, None)):
+            self.queue.put(self.reader.pk, comment=Comment(
+                post=post, author=self.reader, text=text, parent=parent))
+        self.assertEqual(self.queue.flush(), 3)
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(reply.path,
+                         root.path + '.' + threads.segment(reply.pk))
+        self.assertFalse(Comment.objects.filter(path='').exists())
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+        self.assertEqual(other.comment_count, 1)
+
+    def test_failed_batch_applies_items_one_by_one(self):
+        pair = (self.reader.pk, self.author.pk)
+        self.queue.put(self.reader.pk, follow=(pair, True))
+        self.queue.put(self.reader.pk, comment=Comment(
+            post=self.post, author=self.reader, text=None))
+        with self.assertLogs('posts.writebehind', 'ERROR'):
+            self.queue.flush()
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_marker_stays_for_new_writes(self):
+        pair = (self.reader.pk, self.author.pk)
+        self.queue.put(self.reader.pk, follow=(pair, True))
+
+        def write_again(batch):
+            self.queue.put(self.reader.pk, follow=(pair, False))
+
+        with mock.patch.object(writebehind, 'apply_safely', write_again):
+            self.queue.flush()
+        self.assertTrue(cache.get(writebehind.marker(self.reader.pk)))
+        self.assertTrue(self.queue.has(self.reader.pk))
+
+
+@override_settings(POSTS_WRITE_BEHIND=True)
+class WriteBehindViewTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(writebehind, 'queue',
+                                    writebehind.WriteQueue())
+        self.queue = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = get_user_model().objects.create_user(username='author')
+        self.reader = get_user_model().objects.create_user(username='reader')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def comment(self, text):
+        self.client.post(
+            reverse('add_comment', args=('author', self.post.id)),
+            {'text': text},
+        )
+
+    @override_settings(POSTS_WRITE_BEHIND_INTERVAL=60)
+    def test_reader_sees_own_writes(self):
+        self.comment('Свой комментарий')
+        self.assertFalse(Comment.objects.exists())
+        self.client.get(reverse('profile_follow', args=('author',)))
+        response = self.client.get(
+            reverse('post', args=('author', self.post.id)))
+        self.assertContains(response, 'Свой комментарий')
+        self.assertEqual(response.context['author'].profile.follower_count,
+                         1)
+        self.assertEqual(len(self.queue.pending), 0)
+
+    @override_settings(POSTS_WRITE_BEHIND_INTERVAL=0.01)
+    def test_background_flush(self):
+        for i in range(5):
+            self.comment(f'Комментарий {i}')
+        # Тестовая SQLite в памяти не даёт читать таблицу во время записи
+        deadline = time.time() + 5
+        marker = writebehind.marker(self.reader.pk)
+        while cache.get(marker) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertIsNone(cache.get(marker))
+        self.assertEqual(len(self.queue.pending), 0)
+        self.assertEqual(Comment.objects.count(), 5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 5)
@@ -0,0 +1,149 @@
+"""Ветки комментариев с материализованным путём.
+
+Comment.path — номера всех предков и самого комментария через точку,
+каждый дополнен нулями до SEGMENT знаков: 0000000007.0000000012. Так
+сортировка по path даёт обход дерева в глубину, а все ответы в ветке
+лежат в диапазоне [path + '.', path + '/') индекса (post, path) и
+читаются одним запросом.
+
+На странице поста листаются корневые комментарии, новые сверху, и
+каждый выводится со всей своей веткой (comment_page). Путь
+присваивается в сигнале post_save, после bulk_create его проставляет
+fill_paths().
+"""
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Least, Length, LPad, Substr
+
+from .models import Comment
+
+SEGMENT = 10
+SEPARATOR = '.'
+# Глубже ответы прикрепляются к предку на этой глубине
+MAX_DEPTH = 20
+# Дальше этой глубины отступ на странице не растёт
+MAX_INDENT = 6
+COMMENTS_PER_PAGE = 20
+
+
+def segment(pk):
+    return str(pk).zfill(SEGMENT)
+
+
+def depth(path):
+    return path.count(SEPARATOR)
+
+
+def subtree(path):
+    """Фильтр всех потомков комментария с путём path."""
+    # Следующий за точкой символ ограничивает диапазон сверху
+    return Q(path__gte=path + SEPARATOR,
+             path__lt=path + chr(ord(SEPARATOR) + 1))
+
+
+def descendants(comment):
+    """Вся ветка ответов на комментарий в порядке обхода, один запрос."""
+    return Comment.objects.filter(
+        subtree(comment.path), post_id=comment.post_id
+    ).order_by('path')
+
+
+def assign_path(comment):
+    """Проставляет путь только что созданному комментарию."""
+    if comment.parent_id is None:
+        comment.path = segment(comment.pk)
+    else:
+        parent_path = Comment.objects.values_list('path', flat=True).get(
+            pk=comment.parent_id)
+        comment.path = parent_path + SEPARATOR + segment(comment.pk)
+    Comment.objects.filter(pk=comment.pk).update(path=comment.path)
+
+
+def fill_paths(batch_size=1000, posts=None):
+    """Пути для комментариев, вставленных мимо сигналов.
+
+    posts ограничивает поиск комментариями этих постов.
+    """
+    comments = Comment.objects.filter(path='')
+    if posts is not None:
+        comments = comments.filter(post_id__in=posts)
+    comments.filter(parent__isnull=True).update(
+        path=LPad(Cast('id', CharField()), SEGMENT, Value('0'))
+    )
+    while True:
+        pending = list(
+            comments.filter(parent__isnull=False)
+            .exclude(parent__path='')
+            .only('id', 'path', 'parent__path').select_related('parent')
+            [:batch_size]
+        )
+        if not pending:
+            return
+        for comment in pending:
+            comment.path = (comment.parent.path + SEPARATOR
+                            + segment(comment.pk))
+        Comment.objects.bulk_update(pending, ['path'])
+
+
+def reply_parent(post, parent_id):
+    """Комментарий, на который отвечают, или None для нового корня."""
+    try:
+        parent_id = int(parent_id)
+    except (TypeError, ValueError):
+        return None
+    parent = Comment.objects.filter(post=post, pk=parent_id).only(
+        'id', 'path').first()
+    if parent is None or not parent.path:
+        return None
+    if depth(parent.path) >= MAX_DEPTH:
+        ancestor = parent.path.split(SEPARATOR)[MAX_DEPTH - 1]
+        parent = Comment.objects.only('id', 'path').get(pk=int(ancestor))
+    return parent
+
+
+class CommentPage:
+    """Страница веток: comments — QuerySet корней с ответами."""
+
+    def __init__(self, comments, next_cursor):
+        self.comments = comments
+        self.next_cursor = next_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def comment_page(post, cursor=None, per_page=COMMENTS_PER_PAGE):
+    """Страница из per_page корневых веток, новые сверху.
+
+    Курсор — номер последнего показанного корня. Корни идут подряд
+    по path, поэтому вся страница с ответами — один диапазон индекса
+    (post, path); в запросе страницы корни отсортированы по убыванию,
+    ответы внутри ветки — в порядке обхода дерева. Если на страницу
+    попали корни без пути, пути поста сначала заполняются.
+    """
+    roots = Comment.objects.filter(post=post, parent__isnull=True)
+    try:
+        roots = roots.filter(path__lt=segment(int(cursor)))
+    except (TypeError, ValueError):
+        pass
+    paths = list(roots.order_by('-path').values_list('path', flat=True)
+                 [:per_page + 1])
+    if '' in paths:
+        # Корни без пути (bulk_create, loaddata) идут по -path последними
+        fill_paths(posts=[post.pk])
+        paths = list(roots.order_by('-path').values_list('path', flat=True)
+                     [:per_page + 1])
+    next_cursor = None
+    if len(paths) > per_page:
+        paths = paths[:per_page]
+        next_cursor = int(paths[-1])
+    if not paths:
+        return CommentPage(Comment.objects.none(), None)
+    comments = Comment.objects.filter(
+        post=post,
+        path__gte=paths[-1],
+        path__lt=paths[0] + chr(ord(SEPARATOR) + 1),
+    ).select_related('author').annotate(
+        indent=Least((Length('path') - SEGMENT) / (SEGMENT + 1),
+                     MAX_INDENT),
+    ).order_by(Substr('path', 1, SEGMENT).desc(), 'path')
+    return CommentPage(comments, next_cursor)
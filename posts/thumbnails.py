@@ -0,0 +1,144 @@
+"""Производные картинок постов, подготовленные заранее.
+
+После сохранения поста в пуле потоков, вне запроса, строятся копии
+картинки шириной WIDTHS (кадр 4:3 по центру) в современных форматах
+и в JPEG как запасном варианте. Манифест с адресами записывается
+в Post.thumbnails, и шаблон выводит <picture> со srcset одним обращением
+к уже загруженной строке поста, не трогая ни sorl, ни файлы.
+"""
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from .models import Post
+from .pagecache import invalidate_pages
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (320, 640, 1200)
+ASPECT = (4, 3)
+QUALITY = 80
+
+# mime-тип: (формат Pillow, расширение); AVIF и WebP используются,
+# только если Pillow собран с их поддержкой
+FORMATS = {
+    'image/avif': ('AVIF', 'avif'),
+    'image/webp': ('WEBP', 'webp'),
+    'image/jpeg': ('JPEG', 'jpg'),
+}
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'POSTS_THUMBNAIL_WORKERS', 2),
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def supported_formats():
+    Image.init()
+    return {mime: (name, ext) for mime, (name, ext) in FORMATS.items()
+            if name in Image.SAVE}
+
+
+def widths_for(source_width):
+    """Ширины не больше исходной; для мелких картинок — только меньшая."""
+    return [w for w in WIDTHS if w <= source_width] or [WIDTHS[0]]
+
+
+def encode(image, name):
+    buffer = BytesIO()
+    if name == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.save(buffer, name, quality=QUALITY, optimize=name == 'JPEG')
+    return buffer.getvalue()
+
+
+def build(image):
+    """Строит все производные и возвращает манифест."""
+    digest = hashlib.md5(image.name.encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    directory = f'posts/derivatives/{digest}'
+    formats = supported_formats()
+    sources = {mime: [] for mime in formats}
+    manifest = {}
+    with image.open('rb') as file:
+        source = Image.open(file)
+        widths = widths_for(source.width)
+        # Для JPEG декодер сразу уменьшит картинку до нужного масштаба
+        source.draft('RGB', (widths[-1], widths[-1]))
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA' if 'transparency' in source.info
+                                    else 'RGB')
+        for width in widths:
+            height = width * ASPECT[1] // ASPECT[0]
+            frame = ImageOps.fit(source, (width, height), Image.LANCZOS)
+            for mime, (name, ext) in formats.items():
+                path = default_storage.save(
+                    f'{directory}/{stem}-{width}.{ext}',
+                    ContentFile(encode(frame, name))
+                )
+                url = default_storage.url(path)
+                sources[mime].append(f'{url} {width}w')
+                if mime == 'image/jpeg':
+                    manifest.setdefault('small', url)
+                    manifest['card'] = url
+                    manifest['width'], manifest['height'] = width, height
+    # Современные форматы идут в <source>, JPEG — в srcset самого <img>
+    manifest['srcset'] = ', '.join(sources.pop('image/jpeg'))
+    manifest['sources'] = [
+        [mime, ', '.join(items)] for mime, items in sources.items()
+    ]
+    return manifest
+
+
+def generate(post_id):
+    """Строит производные картинки и сохраняет манифест в строке поста."""
+    post = Post.objects.filter(pk=post_id).only('id', 'image').first()
+    if post is None or not post.image:
+        return False
+    try:
+        manifest = build(post.image)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры поста %s', post_id)
+        return False
+    # Картинку могли заменить, пока строились миниатюры
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails=json.dumps(manifest), version=F('version') + 1
+    )
+    if updated:
+        invalidate_pages()
+    return True
+
+
+def run(post_id):
+    try:
+        return generate(post_id)
+    finally:
+        connections.close_all()
+
+
+def schedule(post):
+    """Ставит построение миниатюр в очередь после коммита транзакции."""
+    if not post.image:
+        return
+    if getattr(settings, 'POSTS_THUMBNAILS_SYNC', False):
+        generate(post.pk)
+        return
+    transaction.on_commit(lambda: executor().submit(run, post.pk))
@@ -0,0 +1,209 @@
+"""Разбор текста постов на поисковые термы.
+
+Один и тот же конвейер используют индексатор и разбор запроса:
+слово -> casefold -> ё в е -> стоп-слова -> лёгкий стеммер (Snowball для
+русского, суффиксный для английского). Так «Котиков», «котики» и «КОТИК»
+попадают в один терм, а индекс не раздувается словоформами.
+"""
+import re
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+
+CYRILLIC_RE = re.compile('[а-я]')
+
+STOP_WORDS = frozenset('''
+и в во не что он на я с со как а то все она так его но да ты к у же вы за
+бы по только ее мне было вот от меня еще нет о из ему теперь когда даже ну
+ли если уже или ни быть был него до вас нибудь опять уж вам ведь там потом
+себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам
+чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому
+этого какой ним здесь этом один почти мой тем чтобы нее были куда зачем
+всех можно при об другой хоть после над больше тот через эти нас про всего
+них какая много три эту моя свою этой перед том такой им более всю между
+a an and are as at be but by for from if in into is it its no not of on or
+such that the their then there these they this to was were will with
+'''.split())
+
+RU_VOWELS = 'аеиоуыэюя'
+
+RU_PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+RU_REFLEXIVE = ('ся', 'сь')
+RU_ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+RU_PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+RU_VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+RU_NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+RU_SUPERLATIVE = ('ейше', 'ейш')
+RU_DERIVATIONAL = ('ость', 'ост')
+
+# Слов в постах намного меньше, чем их вхождений
+CACHE_SIZE = 50000
+
+
+def _by_length(endings):
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+def _grouped(groups):
+    return tuple(sorted(
+        ((ending, index) for index, group in enumerate(groups)
+         for ending in group),
+        key=lambda item: len(item[0]), reverse=True,
+    ))
+
+
+RU_PERFECTIVE_GERUND = _grouped(RU_PERFECTIVE_GERUND)
+RU_REFLEXIVE = _by_length(RU_REFLEXIVE)
+RU_ADJECTIVE = _by_length(RU_ADJECTIVE)
+RU_PARTICIPLE = _grouped(RU_PARTICIPLE)
+RU_VERB = _grouped(RU_VERB)
+RU_NOUN = _by_length(RU_NOUN)
+RU_SUPERLATIVE = _by_length(RU_SUPERLATIVE)
+RU_DERIVATIONAL = _by_length(RU_DERIVATIONAL)
+
+
+def _longest(word, start, endings):
+    """Самое длинное окончание из endings, целиком лежащее после start."""
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            return ending
+    return None
+
+
+def _strip_grouped(word, start, candidates):
+    """Снимает окончание; окончания первой группы — только после а/я."""
+    for ending, index in candidates:
+        if not word.endswith(ending) or len(word) - len(ending) < start:
+            continue
+        stem = word[:-len(ending)]
+        if index == 0 and not (stem.endswith(('а', 'я'))
+                               and len(stem) - 1 >= start):
+            continue
+        return stem
+    return None
+
+
+def _regions(word):
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in RU_VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+            r2 = i + 1
+            break
+    return rv, r1, r2
+
+
+def _step1(word, rv):
+    stem = _strip_grouped(word, rv, RU_PERFECTIVE_GERUND)
+    if stem is not None:
+        return stem
+    ending = _longest(word, rv, RU_REFLEXIVE)
+    if ending:
+        word = word[:-len(ending)]
+    adjective = _longest(word, rv, RU_ADJECTIVE)
+    if adjective:
+        stem = word[:-len(adjective)]
+        participle = _strip_grouped(stem, rv, RU_PARTICIPLE)
+        return stem if participle is None else participle
+    stem = _strip_grouped(word, rv, RU_VERB)
+    if stem is not None:
+        return stem
+    ending = _longest(word, rv, RU_NOUN)
+    return word[:-len(ending)] if ending else word
+
+
+def stem_ru(word):
+    """Русский стеммер Snowball (Портер) без исключений."""
+    rv, _, r2 = _regions(word)
+    word = _step1(word, rv)
+    # Шаг 2
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    # Шаг 3
+    ending = _longest(word, r2, RU_DERIVATIONAL)
+    if ending:
+        word = word[:-len(ending)]
+    # Шаг 4
+    ending = _longest(word, rv, RU_SUPERLATIVE)
+    if ending:
+        word = word[:-len(ending)]
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        word = word[:-1]
+    elif word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def _has_vowel(word):
+    return any(char in 'aeiouy' for char in word)
+
+
+def stem_en(word):
+    """Лёгкий английский стеммер: множественное число, -ing, -ed, -ly."""
+    if len(word) <= 3:
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'ches', 'shes', 'zes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    for suffix in ('ingly', 'edly', 'ing', 'ed', 'ly'):
+        stem = word[:-len(suffix)]
+        if word.endswith(suffix) and len(stem) >= 3 and _has_vowel(stem):
+            if stem[-1] == stem[-2] and stem[-1] not in 'lsz':
+                stem = stem[:-1]
+            return stem
+    return word
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize(word):
+    """Терм для слова или None, если это стоп-слово."""
+    word = word.casefold().replace('ё', 'е')
+    if word in STOP_WORDS:
+        return None
+    if CYRILLIC_RE.search(word):
+        word = stem_ru(word)
+    elif word.isascii() and word.isalpha():
+        word = stem_en(word)
+    return word[:MAX_TERM_LENGTH]
+
+
+def tokens(text):
+    """Пары (совпадение, терм) по тексту; терм None для стоп-слов."""
+    for match in TOKEN_RE.finditer(text):
+        yield match, normalize(match.group())
+
+
+def tokenize(text):
+    """Нормализованные термы текста в порядке появления."""
+    return [term for _, term in tokens(text) if term]
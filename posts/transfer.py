@@ -0,0 +1,190 @@
+"""Потоковый экспорт и импорт контента в формате JSON Lines.
+
+Каждая таблица пишется в свой файл <имя>.jsonl по одной строке на объект
+со всеми колонками и исходными первичными ключами, поэтому ссылки между
+таблицами сохраняются. Чтение и запись идут пачками по chunk_size строк:
+память не зависит от размера таблиц.
+
+Импорт вставляет пачки через bulk_create(ignore_conflicts=True), каждую
+в своей транзакции, и после коммита отмечает в файле состояния, сколько
+строк таблицы уже загружено, — прерванный импорт продолжается с этого
+места. Независимые таблицы одного уровня (LEVELS) грузятся параллельно.
+Поля auto_now_add на время вставки отключаются (explicit_dates), чтобы
+даты постов и комментариев остались исходными. Импорт рассчитан
+на пустую базу: строки с уже занятыми ключами пропускаются.
+Картинки передаются ссылкой: в посте остаётся путь файла в хранилище,
+сами файлы копируются отдельно (rsync MEDIA_ROOT).
+
+bulk_create не вызывает сигналы, поэтому после импорта finish() заново
+считает счётчики, проставляет пути веток комментариев, строит поисковый
+индекс и ленты подписок.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from . import counters, feed, search, threads
+from .models import Comment, Follow, Group, Post
+
+CHUNK_SIZE = 1000
+STATE_FILE = 'import-state.json'
+
+
+def tables():
+    return {
+        'users': get_user_model(),
+        'groups': Group,
+        'posts': Post,
+        'comments': Comment,
+        'follows': Follow,
+    }
+
+
+# Таблицы уровня зависят только от таблиц предыдущих уровней
+LEVELS = (('users', 'groups'), ('posts',), ('comments', 'follows'))
+
+
+def table_path(directory, name):
+    return os.path.join(directory, f'{name}.jsonl')
+
+
+def export_table(model, path, chunk_size=CHUNK_SIZE):
+    """Пишет таблицу в файл JSON Lines, возвращает число строк."""
+    columns = [field.attname for field in model._meta.concrete_fields]
+    rows = (model._default_manager.order_by('pk').values(*columns)
+            .iterator(chunk_size=chunk_size))
+    total = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        for row in rows:
+            file.write(json.dumps(row, cls=DjangoJSONEncoder,
+                                  ensure_ascii=False))
+            file.write('\n')
+            total += 1
+    return total
+
+
+def export(directory, names=None, chunk_size=CHUNK_SIZE):
+    os.makedirs(directory, exist_ok=True)
+    return {
+        name: export_table(model, table_path(directory, name), chunk_size)
+        for name, model in tables().items()
+        if names is None or name in names
+    }
+
+
+class ImportState:
+    """Сколько строк каждой таблицы уже загружено; общий для потоков."""
+
+    def __init__(self, directory, resume=True):
+        self.path = os.path.join(directory, STATE_FILE)
+        self.lock = threading.Lock()
+        self.done = {}
+        if resume and os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as file:
+                self.done = json.load(file)
+
+    def get(self, name):
+        return self.done.get(name, 0)
+
+    def advance(self, name, rows):
+        with self.lock:
+            self.done[name] = self.get(name) + rows
+            with open(self.path, 'w', encoding='utf-8') as file:
+                json.dump(self.done, file)
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create сохранил наши даты."""
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def dated_fields(model):
+    return [field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now_add', False)]
+
+
+def build(model, row):
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return model(**{
+        attname: fields[attname].to_python(value)
+        for attname, value in row.items() if attname in fields
+    })
+
+
+def import_table(model, path, name, state, chunk_size=CHUNK_SIZE):
+    """Загружает файл таблицы пачками, возвращает число новых строк."""
+    loaded = 0
+    try:
+        # Даты публикации берутся из файла, а не из времени импорта
+        with open(path, encoding='utf-8') as file, \
+                explicit_dates(*dated_fields(model)):
+            lines = islice(file, state.get(name), None)
+            while True:
+                batch = [build(model, json.loads(line))
+                         for line in islice(lines, chunk_size)]
+                if not batch:
+                    break
+                with transaction.atomic():
+                    model._default_manager.bulk_create(
+                        batch, ignore_conflicts=True
+                    )
+                state.advance(name, len(batch))
+                loaded += len(batch)
+    finally:
+        connection.close()
+    return loaded
+
+
+def reset_sequences(models):
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def finish():
+    """То, что при обычной записи делают сигналы."""
+    counters.recount()
+    threads.fill_paths()
+    search.rebuild()
+    feed.rebuild()
+
+
+def load(directory, chunk_size=CHUNK_SIZE, workers=2, resume=True,
+         rebuild=True):
+    """Импортирует все найденные файлы таблиц, возвращает число строк."""
+    models = tables()
+    state = ImportState(directory, resume=resume)
+    loaded = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for level in LEVELS:
+            jobs = {
+                name: pool.submit(import_table, models[name],
+                                  table_path(directory, name), name, state,
+                                  chunk_size)
+                for name in level
+                if os.path.exists(table_path(directory, name))
+            }
+            for name, job in jobs.items():
+                loaded[name] = job.result()
+    reset_sequences(list(models.values()))
+    if rebuild:
+        with transaction.atomic():
+            finish()
+    return loaded
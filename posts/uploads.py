@@ -0,0 +1,142 @@
+"""Потоковая проверка и очистка загружаемых картинок постов.
+
+LimitedUploadHandler стоит первым в FILE_UPLOAD_HANDLERS и видит файл
+кусками по мере чтения запроса: считает байты и по первым килобайтам
+читает заголовок картинки. Слишком большой файл, чужой формат или
+слишком много пикселей отбрасываются сразу, остаток запроса не
+буферизуется. Причина отказа сохраняется в request.upload_rejections,
+и форма показывает её как ошибку поля.
+
+sanitize() перекодирует принятую картинку: для JPEG декодер сразу
+уменьшает её до POSTS_MAX_IMAGE_SIDE, поворот из EXIF применяется,
+а сами метаданные EXIF не сохраняются.
+"""
+import os
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+HEADER_LIMIT = 256 * 1024
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# GIF не перекодируется, чтобы не потерять анимацию
+REENCODE_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+
+def max_upload_size():
+    return getattr(settings, 'POSTS_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+
+
+def max_image_pixels():
+    return getattr(settings, 'POSTS_MAX_IMAGE_PIXELS', 24 * 1000 * 1000)
+
+
+def max_image_side():
+    return getattr(settings, 'POSTS_MAX_IMAGE_SIDE', 2560)
+
+
+def read_header(data):
+    """Возвращает (формат, ширина, высота) или None, если данных мало."""
+    try:
+        image = Image.open(BytesIO(data))
+    except Image.DecompressionBombError:
+        return 'BOMB', 0, 0
+    except Exception:
+        # Заголовок ещё не дочитан или это вовсе не картинка
+        return None
+    return image.format, image.width, image.height
+
+
+def check_header(header):
+    """Возвращает текст ошибки для заголовка картинки или None."""
+    image_format, width, height = header
+    if image_format == 'BOMB' or width * height > max_image_pixels():
+        return 'Картинка содержит слишком много пикселей'
+    if image_format not in ALLOWED_FORMATS:
+        return 'Формат картинки не поддерживается'
+    return None
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Отбрасывает неподходящую картинку, не дочитывая её до конца."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.head = b''
+        self.checked = False
+
+    def reject(self, message, skip=True):
+        rejections = getattr(self.request, 'upload_rejections', {})
+        rejections[self.field_name] = message
+        self.request.upload_rejections = rejections
+        if skip:
+            raise SkipFile()
+
+    def check(self, final=False):
+        # Из file_complete пропустить файл уже нельзя: он меньше
+        # HEADER_LIMIT, и достаточно отметить ошибку для формы
+        header = read_header(self.head)
+        if header is None:
+            if final or len(self.head) >= HEADER_LIMIT:
+                self.reject('Загрузите правильное изображение',
+                            skip=not final)
+            return
+        error = check_header(header)
+        if error:
+            self.reject(error, skip=not final)
+        self.checked = True
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > max_upload_size():
+            self.reject('Файл слишком большой: не больше %s'
+                        % filesizeformat(max_upload_size()))
+        if not self.checked:
+            self.head += raw_data
+            self.check()
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not self.checked:
+            self.check(final=True)
+        return None
+
+
+def upload_errors(request):
+    return getattr(request, 'upload_rejections', {})
+
+
+def sanitize(upload):
+    """Перекодирует картинку без EXIF, ограничивая её размер."""
+    upload.seek(0)
+    image = Image.open(upload)
+    if image.format not in REENCODE_FORMATS:
+        upload.seek(0)
+        return upload
+    image_format = image.format
+    side = max_image_side()
+    image.draft('RGB', (side, side))
+    image.thumbnail((side, side), Image.LANCZOS)
+    image = ImageOps.exif_transpose(image)
+    options = {'icc_profile': image.info.get('icc_profile')}
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options.update(quality=90, optimize=True)
+    elif image_format == 'WEBP':
+        options.update(quality=90)
+    else:
+        options.update(optimize=True)
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, image_format,
+               **{k: v for k, v in options.items() if v is not None})
+    output.seek(0)
+    return File(output, name=os.path.basename(upload.name))
@@ -1,9 +1,22 @@
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 
+from . import writebehind
+from .conditional import page_state, render_conditional
+from .counters import get_profile
+from .feed import FeedCursorPaginator, feed_queryset, follow_feed
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post
+from .models import Comment, Group, Post
+from .pagecache import cache_anonymous
+from .paginator import POSTS_PER_PAGE, paginate, with_window
+from .search import SearchResults
+from .threads import comment_page, reply_parent
+from .thumbnails import schedule as schedule_thumbnails
+from .uploads import upload_errors
 
 
 def autorized_only(func):
@@ -15,13 +28,27 @@ def autorized_only(func):
     return check_user
 
 
+@cache_anonymous
 def index(request):
-    latest = Post.objects.all()
-    paginator = Paginator(latest, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'index.html', {'page': page,
-                                          'paginator': paginator})
+    latest = feed_queryset()
+    paginator, page = paginate(request, latest)
+    return render_conditional(
+        request, 'index.html', {'page': page, 'paginator': paginator},
+        state=page_state(paginator, page), posts=page.object_list
+    )
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    groups = SearchResults(query, kind='group')[:5] if query else []
+    paginator = Paginator(SearchResults(query), POSTS_PER_PAGE)
+    page = with_window(paginator.get_page(request.GET.get('page')))
+    return render(request, 'search.html', {
+        'query': query,
+        'groups': groups,
+        'page': page,
+        'paginator': paginator,
+    })
 
 
 @autorized_only
@@ -29,68 +56,114 @@ def new_post(request):
     if request.method == 'POST':
         form = PostForm(
             request.POST,
-            files=request.FILES or None
+            files=request.FILES or None,
+            upload_errors=upload_errors(request)
         )
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            form.save()
+            with transaction.atomic():
+                form.save()
+                schedule_thumbnails(post)
             return redirect('index')
         return render(request, 'new_post.html', {'form': form})
     form = PostForm()
     return render(request, 'new_post.html', {'form': form})
 
 
+@cache_anonymous
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'group.html', {'group': group,
-                                          'page': page,
-                                          'paginator': paginator
-                                          })
+    posts = feed_queryset(group.posts.all())
+    paginator, page = paginate(request, posts)
+    return render_conditional(
+        request, 'group.html',
+        {'group': group, 'page': page, 'paginator': paginator},
+        state=(group.title, group.description, page_state(paginator, page)),
+        posts=page.object_list
+    )
 
 
+@cache_anonymous
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
-    paginator = Paginator(author_posts, 10)
-    page_number = request.GET.get('page'),
-    page = paginator.get_page(page_number)
-    count = author_posts.count()
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    profile = get_profile(author)
+    author_posts = feed_queryset(author.posts.all())
+    paginator, page = paginate(request, author_posts,
+                               count=profile.post_count)
     if request.user.is_authenticated and author.following.filter(
         user=request.user
     ).exists():
         following = True
     else:
         following = False
-    count = author_posts.count()
-    return render(request, 'profile.html', {
+    count = profile.post_count
+    state = (author.get_full_name(), count, profile.follower_count,
+             profile.following_count, following,
+             page_state(paginator, page))
+    return render_conditional(request, 'profile.html', {
         'author': author,
         'author_posts': author_posts,
         'page': page,
         'count': count,
         'paginator': paginator,
-        'following': following}
+        'following': following},
+        state=state, posts=page.object_list
     )
 
 
+@cache_anonymous
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(
+        feed_queryset().select_related('author__profile'),
+        id=post_id, author__username=username
+    )
     author = post.author
-    count = author.posts.count()
-    comments = post.comments.all()
+    profile = get_profile(author)
+    count = profile.post_count
+    page = comment_page(post, request.GET.get('cursor'))
     form = CommentForm(request.POST or None)
-    return render(request, 'post.html', {
+    reply_to = None
+    if request.user.is_authenticated and 'reply' in request.GET:
+        reply_to = reply_parent(post, request.GET['reply'])
+    # Комментарии меняют version поста, поэтому отдельно не учитываются
+    state = (author.get_full_name(), count, profile.follower_count,
+             profile.following_count,
+             reply_to.pk if reply_to else None)
+    return render_conditional(request, 'post.html', {
         'post': post,
         'author': author,
         'post_id': post_id,
         'count': count,
         'form': form,
-        'comments': comments
-    })
+        'comments': page.comments,
+        'comments_page': page,
+        'reply_to': reply_to,
+    }, state=state, posts=[post])
+
+
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(
+        Post.objects.select_related('author').only('id', 'author__username'),
+        id=post_id, author__username=username
+    )
+    page = comment_page(post, request.GET.get('cursor'))
+    context = {
+        'post': post,
+        'author': post.author,
+        'comments': page.comments,
+        'comments_page': page,
+    }
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'html': render_to_string('includes/comment_list.html', context,
+                                     request),
+            'next': page.next_cursor,
+        })
+    return render(request, 'includes/comment_list.html', context)
 
 
 @autorized_only
@@ -102,9 +175,15 @@ def post_edit(request, username, post_id):
         request.POST or None,
         files=request.FILES or None,
         instance=post,
+        upload_errors=upload_errors(request),
     )
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            if 'image' in form.changed_data:
+                post.thumbnails = ''
+            form.save()
+            if not post.thumbnails:
+                schedule_thumbnails(post)
         return redirect('post', username=username, post_id=post_id)
     context = {
         'form': form,
@@ -119,12 +198,12 @@ def add_comment(request, username, post_id):
     post = get_object_or_404(Post, author__username=username, id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        comment = Comment.objects.create(
+        writebehind.add_comment(Comment(
             post=post,
             author=request.user,
-            text=request.POST['text']
-        )
-        comment.save()
+            text=form.cleaned_data['text'],
+            parent=reply_parent(post, request.POST.get('parent'))
+        ))
     return redirect('post', username, post_id)
 
 
@@ -144,10 +223,8 @@ def server_error(request):
 @autorized_only
 def follow_index(request):
     user = get_object_or_404(User, username=request.user.username)
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(request, follow_feed(request.user),
+                               cursor_class=FeedCursorPaginator)
     return render(
         request, 'follow.html',
         {'user': user, 'page': page, 'paginator': paginator}
@@ -158,24 +235,23 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        writebehind.follow(request.user.pk, author.pk)
     return redirect('profile', username=author)
 
 
 @autorized_only
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    wire = Follow.objects.filter(user=request.user, author=author)
-    if Follow.objects.filter(user=request.user, author=author).exists():
-        wire.delete()
-        return redirect('profile', username=username)
+    writebehind.unfollow(request.user.pk, author.pk)
     return redirect('profile', username=username)
 
 
+@autorized_only
 def delete_post(request, username, post_id):
-    post = Post.objects.filter(author=username, post_id=post_id)
+    post = get_object_or_404(Post, author__username=username, id=post_id)
     if post.author != request.user:
         return redirect('post', username=username, post_id=post_id)
     else:
-        post.delete()
+        with transaction.atomic():
+            post.delete()
         return redirect('index')
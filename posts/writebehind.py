@@ -0,0 +1,265 @@
+"""Отложенная пакетная запись комментариев и подписок.
+
+С POSTS_WRITE_BEHIND = True представления не пишут в базу сами, а кладут
+комментарии, подписки и отписки в очередь процесса. Фоновый поток раз
+в POSTS_WRITE_BEHIND_INTERVAL секунд или при POSTS_WRITE_BEHIND_BATCH
+записях применяет всё накопленное одной транзакцией: комментарии
+и новые подписки — bulk_create, отписки — одним DELETE. Подписка
+и отписка одной пары в пакете схлопываются: остаётся последняя. Под
+нагрузкой SQLite берёт блокировку записи раз на пакет, а не на каждое
+действие.
+
+bulk_create не вызывает сигналы, поэтому apply() сам делает то же, что
+comment_created и follow_created в posts.signals: пути веток, счётчики,
+ленты подписок и сброс кэша страниц. Если пакет не записался целиком,
+его действия повторяются по одному, а неудачные попадают в лог.
+
+Чтение своих записей: пока у пользователя есть незаписанные действия,
+в кэше лежит его метка. Перед GET-запросом этого пользователя
+WriteBehindMiddleware сбрасывает очередь своего процесса и ждёт, пока
+метка не исчезнет, — с общим кэшем (file, memcached) это работает
+и между процессами.
+
+Без настройки (по умолчанию и в тестах) каждое действие сразу
+применяется тем же apply() в потоке запроса.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+
+from . import counters, feed, threads
+from .cache import POLL_INTERVAL, get_cache
+from .models import Comment, Follow
+from .pagecache import invalidate_pages
+
+logger = logging.getLogger(__name__)
+
+MARKER_TIMEOUT = 60
+
+
+def enabled():
+    return getattr(settings, 'POSTS_WRITE_BEHIND', False)
+
+
+def interval():
+    return getattr(settings, 'POSTS_WRITE_BEHIND_INTERVAL', 0.05)
+
+
+def batch_size():
+    return getattr(settings, 'POSTS_WRITE_BEHIND_BATCH', 200)
+
+
+def marker(user_id):
+    return f'posts:writebehind:{user_id}'
+
+
+class Batch:
+    def __init__(self):
+        self.comments = []
+        # (user_id, author_id): True — подписка, False — отписка
+        self.follows = {}
+        self.users = set()
+
+    def __len__(self):
+        return len(self.comments) + len(self.follows)
+
+    def items(self):
+        """Каждое действие отдельным пакетом, для повтора по одному."""
+        for comment in self.comments:
+            single = Batch()
+            single.comments.append(comment)
+            yield single
+        for pair, state in self.follows.items():
+            single = Batch()
+            single.follows[pair] = state
+            yield single
+
+
+def pairs_filter(pairs):
+    return reduce(or_, (Q(user_id=user_id, author_id=author_id)
+                        for user_id, author_id in pairs))
+
+
+def apply_comments(comments):
+    Comment.objects.bulk_create(comments)
+    posts = Counter(comment.post_id for comment in comments)
+    threads.fill_paths(posts=list(posts))
+    for post_id, delta in posts.items():
+        counters.bump_comments(post_id, delta)
+
+
+def apply_follows(follows):
+    existing = set(Follow.objects.filter(pairs_filter(follows))
+                   .values_list('user_id', 'author_id'))
+    created = [pair for pair, state in follows.items()
+               if state and pair not in existing and pair[0] != pair[1]]
+    removed = [pair for pair, state in follows.items()
+               if not state and pair in existing]
+    if created:
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in created],
+            ignore_conflicts=True,
+        )
+        # Счётчики и ленты — по строкам, которые реально появились:
+        # ignore_conflicts молча пропускает вставленные кем-то ещё
+        inserted = set(Follow.objects.filter(pairs_filter(created))
+                       .values_list('user_id', 'author_id')) - existing
+        counters.recount_follows({user_id for pair in created
+                                  for user_id in pair})
+        for user_id, author_id in inserted:
+            feed.backfill(user_id, author_id)
+    if removed:
+        # Удаление идёт через сигналы follow_deleted
+        Follow.objects.filter(pairs_filter(removed)).delete()
+
+
+def apply(batch):
+    """Записывает пакет одной транзакцией."""
+    with transaction.atomic():
+        if batch.comments:
+            apply_comments(batch.comments)
+        if batch.follows:
+            apply_follows(batch.follows)
+        invalidate_pages()
+
+
+def apply_safely(batch):
+    try:
+        apply(batch)
+    except DatabaseError:
+        if len(batch) == 1:
+            logger.exception('Отложенная запись не удалась')
+            return
+        for single in batch.items():
+            apply_safely(single)
+
+
+class WriteQueue:
+    """Очередь процесса.
+
+    lock охраняет pending, flushing — весь сброс целиком: пакеты
+    применяются строго по очереди (подписка из первого не обгонит
+    отписку из второго), а метка пользователя снимается, только когда
+    его действий нет ни в очереди, ни в записываемом пакете.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flushing = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.pending = Batch()
+        self.thread = None
+
+    def put(self, user_id, comment=None, follow=None):
+        with self.lock:
+            if comment is not None:
+                self.pending.comments.append(comment)
+            if follow is not None:
+                pair, state = follow
+                self.pending.follows[pair] = state
+            self.pending.users.add(user_id)
+            get_cache().set(marker(user_id), 1, MARKER_TIMEOUT)
+            self.start()
+            self.changed.notify()
+
+    def has(self, user_id):
+        with self.lock:
+            return user_id in self.pending.users
+
+    def take(self):
+        with self.lock:
+            batch, self.pending = self.pending, Batch()
+            return batch
+
+    def flush(self):
+        with self.flushing:
+            batch = self.take()
+            if not len(batch):
+                return 0
+            apply_safely(batch)
+            with self.lock:
+                # Метки тех, кто успел добавить новые действия, остаются
+                done = batch.users - self.pending.users
+            get_cache().delete_many([marker(user_id) for user_id in done])
+            return len(batch)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True,
+                                           name='posts-writebehind')
+            self.thread.start()
+            atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            with self.lock:
+                self.changed.wait_for(lambda: len(self.pending))
+                self.changed.wait_for(
+                    lambda: len(self.pending) >= batch_size(),
+                    timeout=interval(),
+                )
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Сбой потока отложенной записи')
+            finally:
+                connection.close_if_unusable_or_obsolete()
+
+
+queue = WriteQueue()
+
+
+def submit(user_id, comment=None, follow=None):
+    if enabled():
+        queue.put(user_id, comment=comment, follow=follow)
+        return
+    batch = Batch()
+    if comment is not None:
+        batch.comments.append(comment)
+    if follow is not None:
+        batch.follows[follow[0]] = follow[1]
+    apply(batch)
+
+
+def add_comment(comment):
+    submit(comment.author_id, comment=comment)
+
+
+def follow(user_id, author_id):
+    submit(user_id, follow=((user_id, author_id), True))
+
+
+def unfollow(user_id, author_id):
+    submit(user_id, follow=((user_id, author_id), False))
+
+
+def settle(user_id, wait=None):
+    """Дожидается записи отложенных действий пользователя."""
+    if queue.has(user_id):
+        queue.flush()
+    cache = get_cache()
+    deadline = time.time() + (interval() * 20 if wait is None else wait)
+    while cache.get(marker(user_id)) and time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+
+
+class WriteBehindMiddleware:
+    """Перед чтением пользователь видит свои отложенные записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (enabled() and request.method in ('GET', 'HEAD')
+                and request.user.is_authenticated):
+            settle(request.user.pk)
+        return self.get_response(request)
@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture
+def query_budget(db):
+    """QueryBudget: `with query_budget('index'):` или `@query_budget(5)`."""
+    from posts.querybudget import QueryBudget
+    return QueryBudget
+
+
+@pytest.fixture
+def constant_queries(db):
+    from posts.querybudget import assert_constant_queries
+    return assert_constant_queries
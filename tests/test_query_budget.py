@@ -0,0 +1,74 @@
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+
+from posts.querybudget import BUDGETS
+
+SIZES = (1, 10, 25)
+
+
+@pytest.fixture
+def grow(user, group, django_user_model):
+    """grow(size): size постов в группе и size комментариев к первому."""
+    from posts.models import Comment, Post
+
+    def grow(size):
+        for i in range(size - Post.objects.count()):
+            Post.objects.create(text=f'Пост {i}', author=user, group=group)
+        first = Post.objects.order_by('id').first()
+        for i in range(size - first.comments.count()):
+            commenter = django_user_model.objects.create_user(
+                username=f'commenter-{size}-{i}'
+            )
+            Comment.objects.create(post=first, author=commenter, text='К')
+        return first
+
+    return grow
+
+
+@pytest.fixture
+def reader_client(user, client, django_user_model):
+    from posts.models import Follow
+    reader = django_user_model.objects.create_user(username='Reader')
+    Follow.objects.create(user=reader, author=user)
+    client.force_login(reader)
+    return client
+
+
+def url_for(name, user, group):
+    from posts.models import Post
+    post = Post.objects.order_by('id').first()
+    args = {
+        'group': (group.slug,),
+        'profile': (user.username,),
+        'post': (user.username, post.id),
+        'post_comments': (user.username, post.id),
+        'api:group_posts': (group.slug,),
+        'api:user_posts': (user.username,),
+        'api:post': (post.id,),
+        'api:comments': (post.id,),
+        'api:user': (user.username,),
+    }
+    url = reverse(name, args=args.get(name, ()))
+    return url + '?q=пост' if name == 'search' else url
+
+
+class TestQueryBudget:
+
+    @pytest.mark.parametrize('name', sorted(BUDGETS))
+    def test_view_fits_budget(self, name, user, group, grow, reader_client,
+                              query_budget):
+        grow(SIZES[-1])
+        url = url_for(name, user, group)
+        for cache in caches.all():
+            cache.clear()
+        with query_budget(name):
+            response = reader_client.get(url)
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('name', sorted(BUDGETS))
+    def test_queries_do_not_grow_with_data(self, name, user, group, grow,
+                                           reader_client, constant_queries):
+        grow(SIZES[0])
+        url = url_for(name, user, group)
+        constant_queries(lambda: reader_client.get(url), grow, sizes=SIZES)
@@ -49,11 +49,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'posts.writebehind.WriteBehindMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,11 +63,21 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
+# Шаблоны: YATUBE_TEMPLATE_CACHE=1 (и всегда при DEBUG=False) компилирует
+# каждый шаблон один раз на процесс, правки файлов видны только после
+# перезапуска
+YATUBE_TEMPLATE_CACHE = (
+    os.environ.get('YATUBE_TEMPLATE_CACHE', '0') == '1' or not DEBUG
+)
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -73,6 +85,10 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if YATUBE_TEMPLATE_CACHE else TEMPLATE_LOADERS
+            ),
         },
     },
 ]
@@ -83,13 +99,33 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# YATUBE_CONN_MAX_AGE — сколько секунд воркер держит соединение с базой
+# (0 — новое на каждый запрос)
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get(
+            'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_CONN_MAX_AGE', '600')),
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (posts.sqlite): WAL, чтобы
+# читатели не ждали писателя, и ожидание блокировки вместо «database is
+# locked»; YATUBE_SQLITE_TUNING=0 оставляет настройки SQLite по умолчанию
+YATUBE_SQLITE_TUNING = os.environ.get('YATUBE_SQLITE_TUNING', '1') == '1'
+POSTS_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+} if YATUBE_SQLITE_TUNING else {}
+# Транзакции сразу берут блокировку записи: ожидание вместо ошибки
+POSTS_SQLITE_BEGIN = 'IMMEDIATE' if YATUBE_SQLITE_TUNING else None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -133,13 +169,108 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Картинки проверяются на лету, пока загружаются: размер файла,
+# число пикселей по заголовку; затем перекодируются без EXIF
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+POSTS_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+POSTS_MAX_IMAGE_PIXELS = 24 * 1000 * 1000
+POSTS_MAX_IMAGE_SIDE = 2560
+
 #  подключаем движок filebased.EmailBackend
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
-CACHES = {
-    'default': {
+# Кэш: по умолчанию локальный для процесса. При нескольких воркерах
+# YATUBE_CACHE=file или YATUBE_CACHE=memcached включает общий для всех кэш,
+# YATUBE_CACHE_LOCATION задаёт каталог или сокет
+YATUBE_CACHE = os.environ.get('YATUBE_CACHE', 'locmem')
+
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', 'unix:/tmp/memcached.sock'
+        ),
+    },
+}
+
+CACHES = {
+    'default': dict(
+        CACHE_BACKENDS[YATUBE_CACHE],
+        KEY_PREFIX='yatube',
+        VERSION=1,
+    )
+}
+
+# Алиас кэша, которым пользуется posts.cache
+POSTS_CACHE_ALIAS = 'default'
+
+# Кэш целых страниц лент и постов для анонимных читателей
+POSTS_PAGE_CACHE = True
+POSTS_PAGE_CACHE_TIMEOUT = 300
+
+# Режим пагинации лент: 'offset' (номера страниц) или 'cursor' (keyset)
+POSTS_PAGINATION = 'offset'
+# Число постов для номеров страниц: 'exact' — COUNT(*) на каждый запрос,
+# 'approximate' — счётчик профиля или COUNT из кэша на TIMEOUT секунд
+POSTS_PAGINATION_COUNT = 'exact'
+POSTS_PAGINATION_COUNT_TIMEOUT = 300
+
+# Материализованная лента подписок: длина ленты на пользователя и порог
+# подписчиков, после которого посты автора подмешиваются при чтении
+POSTS_FEED_LENGTH = 500
+POSTS_FANOUT_LIMIT = 1000
+
+# Миниатюры строятся в фоновом пуле потоков; SYNC=True строит их сразу
+POSTS_THUMBNAIL_WORKERS = 2
+POSTS_THUMBNAILS_SYNC = False
+
+# Отложенная запись комментариев и подписок: пакеты раз в INTERVAL секунд
+# или по BATCH действий; False пишет каждое действие сразу
+POSTS_WRITE_BEHIND = False
+POSTS_WRITE_BEHIND_INTERVAL = 0.05
+POSTS_WRITE_BEHIND_BATCH = 200
+
+# Счётчики SQL, шаблонов и кэша на запрос: заголовок Server-Timing и лог
+# posts.requests; медленные запросы с их SQL — в posts.requests.slow
+POSTS_INSTRUMENTATION = True
+# Заголовок Server-Timing в ответах (YATUBE_SERVER_TIMING=1)
+POSTS_SERVER_TIMING = os.environ.get('YATUBE_SERVER_TIMING', '0') == '1'
+POSTS_DUPLICATE_QUERIES = 3
+POSTS_SLOW_REQUEST_MS = 500
+POSTS_SLOW_REQUEST_SAMPLE = 1.0
+# Время каждого шаблона и include в запросе (лог и Server-Timing)
+POSTS_TEMPLATE_PROFILE = (
+    os.environ.get('YATUBE_TEMPLATE_PROFILE', '0') == '1'
+)
+# Компилировать все шаблоны при старте (только с кэшем шаблонов)
+POSTS_TEMPLATE_WARMUP = os.environ.get('YATUBE_TEMPLATE_WARMUP', '1') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'posts.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_REQUEST_LOG', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }
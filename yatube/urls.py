@@ -24,6 +24,7 @@ urlpatterns = [
     path("auth/", include("django.contrib.auth.urls")),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
     path('', include('posts.urls')),
 ]
 handler404 = "posts.views.page_not_found"  # noqa